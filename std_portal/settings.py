@@ -149,13 +149,83 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 # Allowed file types for uploads
 ALLOWED_FILE_TYPES = ['.pdf', '.doc', '.docx', '.txt', '.ppt', '.pptx']
 
-# Cache settings
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache settings. With REDIS_URL every web worker and cron job shares one
+# cache, so content version bumps and single-flight locks (cache.add) reach
+# all of them. Without it each process has its own LocMemCache: a change only
+# invalidates the cache of the process that made it, and the others serve
+# their entries until they time out, so the content-versioned timeouts below
+# are kept short.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
+    }
+SHARED_CACHE = bool(REDIS_URL)
+ADMIN_STATS_CACHE_TIMEOUT = 600 if SHARED_CACHE else 60  # seconds; content changes invalidate earlier
+
+# Search index settings
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index' / 'tfidf_index.joblib'
+SEARCH_CACHE_TIMEOUT = 300 if SHARED_CACHE else 60  # seconds; content changes invalidate earlier
+SEARCH_CACHE_MAX_RESULTS = 1000  # larger result sets are not cached
+RESOURCE_TEXT_EXTRACT_ON_SAVE = True  # extract uploaded PDF text in a background thread after commit
+
+# Trending settings (scores halve after this many hours without activity)
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_EVENT_LAG = 300  # seconds; younger events are left for the next pass (async event log batches land late)
+
+# Collaborative filtering (build_similarity --method collaborative): resources
+# compared per sparse product, minimum cosine similarity kept, and days of
+# view/download history used (None = all)
+COLLABORATIVE_CHUNK_SIZE = 1000
+COLLABORATIVE_MIN_SCORE = 0.05
+COLLABORATIVE_HISTORY_DAYS = None
+
+# Recommendation cache: entries are served for up to RECOMMENDATION_CACHE_TIMEOUT
+# seconds and refreshed in the background once older than the soft TTL
+RECOMMENDATION_CACHE_SOFT_TTL = 300
+RECOMMENDATION_CACHE_TIMEOUT = 3600
+# ...or earlier after this many views/downloads, or this many seconds after
+# the last computation if the user has been active since
+RECOMMENDATION_REFRESH_EVENTS = 5
+RECOMMENDATION_REFRESH_INTERVAL = 60
+# Requests waiting for another request's computation give up after this many
+# seconds and serve the faculty's shared segments
+RECOMMENDATION_WAIT_TIMEOUT = 2
+# Trending segments shared by all students of a faculty are cached this long
+RECOMMENDATION_SHARED_CACHE_TIMEOUT = 300 if SHARED_CACHE else 60
+
+# Offline recommendations (precompute_recommendations): lists per kind stored
+# per user, and how long stored lists are served to users without a cache entry
+RECOMMENDATION_PRECOMPUTE_LIMIT = 6
+RECOMMENDATION_PRECOMPUTE_MAX_AGE = 86400
+
+# Autocomplete index is rebuilt at least this often (seconds); content
+# changes in this worker trigger an earlier rebuild
+AUTOCOMPLETE_MAX_AGE = 300
+
+# View/download counter settings (False writes each increment immediately)
+COUNTER_BUFFERING = True
+COUNTER_FLUSH_INTERVAL = 5  # seconds
+COUNTER_MAX_PENDING = 500  # buffered rows that trigger an immediate flush
+COUNTER_FLUSH_BATCH_SIZE = 200  # rows per UPDATE statement
+
+# ViewLog/DownloadLog writer settings (False writes each event in the request)
+EVENT_LOG_ASYNC = True
+EVENT_LOG_BATCH_SIZE = 200
+EVENT_LOG_FLUSH_INTERVAL = 2  # seconds
+EVENT_LOG_QUEUE_SIZE = 10000
+EVENT_LOG_MAX_RETRIES = 3  # attempts of a failed batch before its events are dropped
+EVENT_LOG_EXIT_TIMEOUT = 5  # seconds to wait for the flusher's last batch at exit
 
 # Session settings
 SESSION_COOKIE_AGE = 3600 * 24 * 7  # 7 days
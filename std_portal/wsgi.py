@@ -10,4 +10,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'std_portal.production')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Build the in-memory autocomplete index before the first request needs it
+from student_app.autocomplete import warm_autocomplete_index  # noqa: E402
+
+warm_autocomplete_index()
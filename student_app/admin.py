@@ -11,6 +11,8 @@ from .models import (
     ContributorRequest, DownloadLog, ViewLog, Article, ArticleComment, ArticleLike,
     MCQQuiz, MCQQuestion, MCQOption, MCQUserAnswer, MCQQuizSession
 )
+from .admin_stats import get_admin_statistics
+from .trending import get_trending_subjects
 
 @admin.register(Faculty)
 class FacultyAdmin(admin.ModelAdmin):
@@ -112,11 +114,16 @@ class ResourceAdmin(admin.ModelAdmin):
     actions = ['approve_resources', 'reject_resources']
 
     def approve_resources(self, request, queryset):
-        queryset.update(status='approved')
+        # Save each resource so post_save hooks (search index etc.) see the change
+        for resource in queryset:
+            resource.status = 'approved'
+            resource.save(update_fields=['status', 'updated_at'])
     approve_resources.short_description = "Approve selected resources"
 
     def reject_resources(self, request, queryset):
-        queryset.update(status='rejected')
+        for resource in queryset:
+            resource.status = 'rejected'
+            resource.save(update_fields=['status', 'updated_at'])
     reject_resources.short_description = "Reject selected resources"
 
 
@@ -355,35 +362,15 @@ class AnalyticsAdmin(admin.ModelAdmin):
         # Add analytics data to the changelist view
         extra_context = extra_context or {}
         
-        # Get trending subjects (based on downloads in last 7 days)
-        week_ago = timezone.now() - timedelta(days=7)
-        trending_subjects = Subject.objects.annotate(
-            recent_downloads=Count(
-                'syllabi__download_count',
-                filter=Q(syllabi__created_at__gte=week_ago)
-            ) + Count(
-                'notes__download_count',
-                filter=Q(notes__created_at__gte=week_ago)
-            ) + Count(
-                'question_banks__download_count',
-                filter=Q(question_banks__created_at__gte=week_ago)
-            )
-        ).order_by('-recent_downloads')[:5]
+        # Trending subjects come from the trending engine, totals from the
+        # cached statistics snapshot
+        stats = get_admin_statistics()
+        main_types = ['syllabus', 'note', 'questionbank', 'chapter']
         
-        extra_context['trending_subjects'] = trending_subjects
+        extra_context['trending_subjects'] = get_trending_subjects(limit=5)
         extra_context['total_users'] = UserProfile.objects.count()
-        extra_context['total_resources'] = (
-            Syllabus.objects.filter(status='approved').count() +
-            Note.objects.filter(status='approved').count() +
-            QuestionBank.objects.filter(status='approved').count() +
-            Chapter.objects.filter(status='approved').count()
-        )
-        extra_context['pending_approvals'] = (
-            Syllabus.objects.filter(status='pending').count() +
-            Note.objects.filter(status='pending').count() +
-            QuestionBank.objects.filter(status='pending').count() +
-            Chapter.objects.filter(status='pending').count()
-        )
+        extra_context['total_resources'] = sum(stats.count(content_type, 'approved') for content_type in main_types)
+        extra_context['pending_approvals'] = sum(stats.count(content_type, 'pending') for content_type in main_types)
         
         return super().changelist_view(request, extra_context)
 
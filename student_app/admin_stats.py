@@ -0,0 +1,176 @@
+"""
+Admin Statistics for Student Portal
+
+Builds the resource/subject counts shown on the admin dashboard and the
+faculty level pages from a fixed number of grouped queries: one per resource
+model, grouped by faculty and level with per-status conditional counts, plus
+one for subjects. The page structures (faculty_stats, level_breakdown, ...)
+are then assembled in Python, so the query count does not grow with the
+number of faculties or levels.
+
+get_admin_statistics() caches the snapshot under the content version, so the
+queries only run again after resources, subjects or faculties changed.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .cache_utils import versioned_key
+from .models import Faculty, Subject, RESOURCE_MODELS
+
+STATUSES = ('pending', 'approved', 'rejected')
+
+
+class AdminStatistics:
+    """
+    Grouped resource and subject counts
+
+    `resources[content_type][(faculty_id, level)]` holds a dict with 'total'
+    and one count per status; `subjects[(faculty_id, level)]` lists the
+    subjects of that level.
+    """
+
+    def __init__(self):
+        self.resources = {}
+        for content_type, model in RESOURCE_MODELS.items():
+            rows = model.objects.values('subject__faculty_id', 'subject__level').annotate(
+                total=Count('id'),
+                **{status: Count('id', filter=Q(status=status)) for status in STATUSES}
+            ).order_by()
+            self.resources[content_type] = {
+                (row['subject__faculty_id'], row['subject__level']): row for row in rows
+            }
+
+        self.subjects = defaultdict(list)
+        for subject in Subject.objects.values('id', 'name', 'level', 'faculty_id', 'is_active').order_by('name'):
+            self.subjects[(subject['faculty_id'], subject['level'])].append(subject)
+
+        self.faculties = list(Faculty.objects.filter(is_active=True).order_by('name'))
+
+    def count(self, content_type, status=None, faculty_id=None, level=None):
+        """
+        Number of resources of a type, optionally narrowed down
+
+        Args:
+            content_type: Resource type key (see RESOURCE_MODELS)
+            status: Count only this status (all statuses if None)
+            faculty_id: Restrict to a faculty
+            level: Restrict to a level (with faculty_id)
+
+        Returns:
+            Resource count
+        """
+        field = status or 'total'
+        return sum(
+            row[field]
+            for (row_faculty, row_level), row in self.resources[content_type].items()
+            if (faculty_id is None or row_faculty == faculty_id)
+            and (level is None or row_level == level)
+        )
+
+    def subject_list(self, faculty_id=None, level=None, active_only=False):
+        """Subjects (as dicts) of a faculty and/or level"""
+        return [
+            subject
+            for (row_faculty, row_level), subjects in self.subjects.items()
+            if (faculty_id is None or row_faculty == faculty_id)
+            and (level is None or row_level == level)
+            for subject in subjects
+            if subject['is_active'] or not active_only
+        ]
+
+    def level_breakdown(self, faculty, status=None, active_only=False):
+        """
+        Per-level counts of a faculty, as rendered by the admin templates
+
+        Args:
+            faculty: Faculty instance
+            status: Count only resources with this status
+            active_only: Count and list only active subjects
+
+        Returns:
+            List of dicts, one per level
+        """
+        levels = []
+        for level in range(1, faculty.total_levels + 1):
+            counts = {
+                key: self.count(content_type, status, faculty.id, level)
+                for key, content_type in (
+                    ('syllabi', 'syllabus'), ('questions', 'questionbank'), ('chapters', 'chapter'),
+                    ('textbooks', 'textbook'), ('practicals', 'practical'), ('vivas', 'viva'),
+                )
+            }
+            subjects = self.subject_list(faculty.id, level, active_only)
+            levels.append({
+                'level': level,
+                'level_name': faculty.get_level_display_name(level),
+                'subjects': len(subjects),
+                **counts,
+                'total_resources': sum(counts.values()),
+                'subject_list': [
+                    {'id': subject['id'], 'name': subject['name'], 'level': subject['level']}
+                    for subject in subjects
+                ],
+            })
+        return levels
+
+    def faculty_stats(self):
+        """Per-faculty totals with level breakdown for the admin dashboard"""
+        stats = []
+        for faculty in self.faculties:
+            counts = {
+                key: self.count(content_type, faculty_id=faculty.id)
+                for key, content_type in (
+                    ('syllabi', 'syllabus'), ('notes', 'note'), ('questions', 'questionbank'), ('chapters', 'chapter'),
+                )
+            }
+            stats.append({
+                'faculty': faculty,
+                'subjects': len(self.subject_list(faculty.id)),
+                **counts,
+                'total_resources': sum(counts.values()),
+                'level_breakdown': self.level_breakdown(faculty),
+            })
+        return stats
+
+    def faculty_summaries(self):
+        """Active faculties annotated with active subject and approved resource counts"""
+        for faculty in self.faculties:
+            faculty.subject_count = len(self.subject_list(faculty.id, active_only=True))
+            faculty.resource_count = sum(
+                self.count(content_type, 'approved', faculty.id)
+                for content_type in ('syllabus', 'note', 'questionbank', 'chapter')
+            )
+        return self.faculties
+
+    def resource_breakdown(self):
+        """Total/pending/approved counts of the four main resource types"""
+        return {
+            key: {
+                'total': self.count(content_type),
+                'pending': self.count(content_type, 'pending'),
+                'approved': self.count(content_type, 'approved'),
+            }
+            for key, content_type in (
+                ('syllabi', 'syllabus'), ('notes', 'note'),
+                ('question_banks', 'questionbank'), ('chapters', 'chapter'),
+            )
+        }
+
+
+def get_admin_statistics():
+    """
+    Cached AdminStatistics snapshot for the current content version
+
+    Returns:
+        AdminStatistics instance
+    """
+    key = versioned_key('admin_statistics')
+    stats = cache.get(key)
+    if stats is None:
+        stats = AdminStatistics()
+        cache.set(key, stats, getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 600))
+    return stats
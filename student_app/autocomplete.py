@@ -0,0 +1,195 @@
+"""
+Autocomplete Index for Student Portal
+
+An in-memory trigram index over active subject names and approved resource
+titles, used by the /api/autocomplete/ endpoint. Each label is split into
+words and every word contributes its padded trigrams ("  a", " al", "alg",
+..., "hm "), so both prefixes and misspellings ("algoritm") share most of
+their trigrams with the intended word.
+
+A suggestion's score is the fraction of the query's trigrams it contains,
+with a bonus when a label word starts with the last query word. The index is
+built when the worker starts (see std_portal/wsgi.py) and rebuilt in the
+background after the content version changes or AUTOCOMPLETE_MAX_AGE seconds.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from .cache_utils import get_content_version
+from .models import Subject, RESOURCE_MODELS
+
+logger = logging.getLogger(__name__)
+
+MIN_SCORE = 0.5
+PREFIX_BONUS = 0.5
+
+
+class Suggestion(NamedTuple):
+    text: str
+    type: str
+    id: int
+    url: str
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase words of a label or query"""
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def word_trigrams(word: str, partial: bool = False) -> List[str]:
+    """
+    Padded trigrams of a word
+
+    Args:
+        word (str): Lowercase word
+        partial (bool): The word may be incomplete (last word of a query),
+            so the end-of-word trigram is left out
+
+    Returns:
+        List[str]: Trigrams
+    """
+    padded = f"  {word}" if partial else f"  {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _resource_url(content_type: str, resource) -> str:
+    if content_type == 'chapter':
+        return reverse('chapter_detail', args=[resource.subject_id, resource.id])
+    if content_type == 'questionbank':
+        return reverse('question_bank_detail', args=[resource.subject_id, resource.id])
+    if content_type == 'syllabus':
+        return reverse('syllabus_detail', args=[resource.subject_id, resource.id])
+    return reverse('subject_detail', args=[resource.subject_id])
+
+
+class AutocompleteIndex:
+    """Trigram postings over suggestion labels"""
+
+    def __init__(self, suggestions: List[Suggestion], version):
+        self.suggestions = suggestions
+        self.version = version
+        self.built_at = time.monotonic()
+        self.words = [normalize(suggestion.text) for suggestion in suggestions]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for position, words in enumerate(self.words):
+            for trigram in {t for word in words for t in word_trigrams(word)}:
+                self.postings[trigram].append(position)
+
+    @classmethod
+    def build(cls) -> 'AutocompleteIndex':
+        version = get_content_version()
+        suggestions = [
+            Suggestion(subject.name, 'subject', subject.id, reverse('subject_detail', args=[subject.id]))
+            for subject in Subject.objects.filter(is_active=True).only('id', 'name')
+        ]
+        for content_type, model in RESOURCE_MODELS.items():
+            for resource in model.objects.filter(status='approved').only('id', 'title', 'subject_id'):
+                suggestions.append(Suggestion(
+                    resource.title, content_type, resource.id, _resource_url(content_type, resource)
+                ))
+        return cls(suggestions, version)
+
+    def search(self, query: str, limit: int = 10) -> List[Suggestion]:
+        """
+        Best matching suggestions for a (possibly partial or misspelled) query
+
+        Args:
+            query (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            List[Suggestion]: Suggestions, best first
+        """
+        words = normalize(query)
+        if not words:
+            return []
+        trigrams = set()
+        for i, word in enumerate(words):
+            trigrams.update(word_trigrams(word, partial=i == len(words) - 1))
+
+        hits = Counter()
+        for trigram in trigrams:
+            hits.update(self.postings.get(trigram, ()))
+
+        last_word = words[-1]
+        scored = []
+        for position, shared in hits.items():
+            score = shared / len(trigrams)
+            if score < MIN_SCORE:
+                continue
+            if any(word.startswith(last_word) for word in self.words[position]):
+                score += PREFIX_BONUS
+            scored.append((-score, len(self.suggestions[position].text), position))
+        scored.sort()
+        return [self.suggestions[position] for _, _, position in scored[:limit]]
+
+
+_index: Optional[AutocompleteIndex] = None
+_rebuilding = threading.Lock()
+
+
+def _rebuild() -> None:
+    global _index
+    try:
+        _index = AutocompleteIndex.build()
+    except Exception as e:
+        logger.error(f"Autocomplete index build failed: {e}")
+    finally:
+        _rebuilding.release()
+
+
+def _rebuild_in_background() -> None:
+    if not _rebuilding.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            _rebuild()
+        finally:
+            # The build thread opened its own connection
+            connections.close_all()
+
+    threading.Thread(target=run, name='autocomplete-index', daemon=True).start()
+
+
+def warm_autocomplete_index() -> None:
+    """Start building the index in the background (called at worker start)"""
+    _rebuild_in_background()
+
+
+def get_autocomplete_index() -> Optional[AutocompleteIndex]:
+    """
+    The worker's index, rebuilt in the background when it is stale
+
+    The first call builds the index synchronously if warming has not
+    finished yet.
+    """
+    index = _index
+    if index is None:
+        if _rebuilding.acquire(blocking=False):
+            _rebuild()
+        else:
+            # A warm-up build is running; wait for it
+            with _rebuilding:
+                pass
+        return _index
+
+    max_age = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300)
+    if index.version != get_content_version() or time.monotonic() - index.built_at > max_age:
+        _rebuild_in_background()
+    return index
+
+
+def autocomplete(query: str, limit: int = 10) -> List[Suggestion]:
+    """Top suggestions for a query (empty if the index could not be built)"""
+    index = get_autocomplete_index()
+    return index.search(query, limit) if index is not None else []
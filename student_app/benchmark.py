@@ -0,0 +1,304 @@
+"""
+Search Benchmark for Student Portal
+
+Generates a synthetic catalogue (faculties, subjects and resources with
+generated academic text) and replays a mixed query workload through the
+`search` and `advanced_search` views and `perform_enhanced_search`,
+recording latency percentiles and database query counts per entry point.
+
+Used by ``python manage.py benchmark_search``, which runs everything inside
+a transaction that is rolled back, so the synthetic rows never persist.
+"""
+
+import random
+import statistics
+import time
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Callable, Dict, List
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .cache_utils import bump_content_version
+from .models import (
+    Faculty, Subject, Syllabus, Note, QuestionBank, Chapter, Viva, TextBook, Practical,
+    RESOURCE_MODELS
+)
+
+SUBJECT_NAMES = [
+    'Data Structures and Algorithms', 'Database Management System', 'Operating Systems',
+    'Computer Networks', 'Java Programming', 'Object Oriented Programming in C++',
+    'Discrete Mathematics', 'Digital Logic', 'Microprocessor', 'Software Engineering',
+    'Artificial Intelligence', 'Compiler Design', 'Computer Graphics', 'Web Technology',
+    'Numerical Methods', 'Statistics', 'Theory of Computation', 'Cryptography',
+    'Simulation and Modelling', 'Distributed Systems', 'Cloud Computing',
+    'Financial Accounting', 'Business Statistics', 'Principles of Management',
+    'Microeconomics', 'Macroeconomics', 'Marketing', 'Business Law',
+]
+
+TOPIC_WORDS = """
+algorithm array stack queue linked list tree graph heap hashing sorting searching
+recursion complexity dynamic programming greedy normalization transaction index
+query relational schema sql join concurrency deadlock scheduling process thread
+memory paging segmentation file system protocol routing tcp ip socket network
+layer encryption security class object inheritance polymorphism encapsulation
+interface exception compiler parser lexer grammar automata regular expression
+turing machine probability distribution regression matrix vector integration
+differentiation interpolation equation circuit gate flip flop register cache
+pipeline instruction assembly requirement design testing maintenance agile model
+neural network learning search heuristic logic inference rendering transformation
+projection html css javascript server client session cookie ledger balance sheet
+journal revenue cost demand supply market elasticity planning organizing
+leadership contract company partnership consumer pricing promotion
+""".split()
+
+FILLER_WORDS = """
+the of and to in is for with on by this that are from as an be at which it its
+introduction overview chapter unit example examples important question questions
+answer solution notes exam previous year model practice lecture summary basic
+advanced concept concepts definition explain describe compare analysis
+""".split()
+
+RESOURCE_SHARES = [
+    ('note', 0.30), ('chapter', 0.20), ('questionbank', 0.15), ('syllabus', 0.10),
+    ('viva', 0.10), ('textbook', 0.08), ('practical', 0.07),
+]
+
+STATUS_SHARES = [('approved', 0.85), ('pending', 0.10), ('rejected', 0.05)]
+
+
+class TextGenerator:
+    """Random academic-looking text with a Zipf-like word distribution"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.words = TOPIC_WORDS + FILLER_WORDS
+        self.weights = [1 / (rank + 1) ** 0.8 for rank in range(len(self.words))]
+        self.rng.shuffle(self.weights)
+
+    def sample(self, count: int) -> List[str]:
+        return self.rng.choices(self.words, weights=self.weights, k=count)
+
+    def title(self, subject_name: str) -> str:
+        topic = ' '.join(self.rng.sample(TOPIC_WORDS, self.rng.randint(1, 3))).title()
+        return f"{topic} - {subject_name}"[:200]
+
+    def paragraph(self, low: int = 20, high: int = 80) -> str:
+        return ' '.join(self.sample(self.rng.randint(low, high))).capitalize() + '.'
+
+
+def _pick(rng: random.Random, shares) -> str:
+    values, weights = zip(*shares)
+    return rng.choices(values, weights=weights)[0]
+
+
+def generate_corpus(resources: int = 20000, faculties: int = 4, subjects_per_level: int = 5,
+                    seed: int = 0) -> Dict[str, int]:
+    """
+    Create synthetic faculties, subjects and resources with bulk inserts
+
+    Bulk inserts skip model signals, so search vectors (PostgreSQL) are
+    filled in with one UPDATE per resource table afterwards.
+
+    Args:
+        resources (int): Number of resources to create across all types
+        faculties (int): Number of faculties (8 levels each)
+        subjects_per_level (int): Subjects per faculty level
+        seed (int): Random seed, so runs are comparable
+
+    Returns:
+        Dict[str, int]: Number of rows created per model
+    """
+    rng = random.Random(seed)
+    text = TextGenerator(rng)
+    stamp = int(time.time())
+
+    faculty_objs = Faculty.objects.bulk_create([
+        Faculty(name=f"Benchmark Faculty {stamp}-{i}", description=text.paragraph(), total_levels=8)
+        for i in range(faculties)
+    ])
+    subject_objs = Subject.objects.bulk_create([
+        Subject(
+            name=rng.choice(SUBJECT_NAMES), faculty=faculty, level=level,
+            description=text.paragraph(),
+        )
+        for faculty in faculty_objs
+        for level in range(1, faculty.total_levels + 1)
+        for _ in range(subjects_per_level)
+    ])
+
+    rows = {content_type: [] for content_type in RESOURCE_MODELS}
+    chapter_numbers = {}
+    for _ in range(resources):
+        content_type = _pick(rng, RESOURCE_SHARES)
+        subject = rng.choice(subject_objs)
+        common = {
+            'subject': subject,
+            'title': text.title(subject.name),
+            'status': _pick(rng, STATUS_SHARES),
+            'view_count': int(rng.paretovariate(1.2) * 10),
+            'created_at': timezone.now() - timedelta(seconds=rng.uniform(0, 2 * 365 * 86400)),
+        }
+        if content_type != 'viva':
+            common['download_count'] = int(rng.paretovariate(1.5) * 3)
+
+        if content_type == 'syllabus':
+            obj = Syllabus(content=text.paragraph(80, 300), **common)
+        elif content_type == 'note':
+            obj = Note(description=text.paragraph(), **common)
+        elif content_type == 'questionbank':
+            obj = QuestionBank(description=text.paragraph(), **common)
+        elif content_type == 'chapter':
+            number = chapter_numbers.get(subject.id, 0) + 1
+            chapter_numbers[subject.id] = number
+            obj = Chapter(description=text.paragraph(), chapter_number=number, **common)
+        elif content_type == 'viva':
+            obj = Viva(description=text.paragraph(), question=text.paragraph(8, 20),
+                       answer=text.paragraph(30, 120), **common)
+        elif content_type == 'textbook':
+            obj = TextBook(description=text.paragraph(), author=text.title('').strip(' -'), **common)
+        else:
+            obj = Practical(description=text.paragraph(), objective=text.paragraph(10, 30),
+                            procedure=text.paragraph(40, 150), **common)
+        rows[content_type].append(obj)
+
+    created = {'faculty': len(faculty_objs), 'subject': len(subject_objs)}
+    for content_type, objs in rows.items():
+        RESOURCE_MODELS[content_type].objects.bulk_create(objs, batch_size=1000)
+        created[content_type] = len(objs)
+
+    from .search_backend import full_text_enabled, search_vector
+    if full_text_enabled():
+        for content_type, model in RESOURCE_MODELS.items():
+            model.objects.filter(search_vector__isnull=True).update(search_vector=search_vector(content_type))
+    return created
+
+
+def build_query_mix(count: int = 200, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    Search parameters resembling real traffic
+
+    About 40% of queries come from a small set of hot queries; the rest are
+    single words, word pairs and prefixes, some with faculty, level or type
+    filters.
+
+    Returns:
+        List[Dict[str, str]]: GET parameters for views.search
+    """
+    rng = random.Random(seed + 1)
+    hot = ['dbms', 'java', 'syllabus', 'algorithm', 'operating system',
+           'network', 'sorting', 'sql', 'tree', 'accounting']
+    faculty_ids = list(Faculty.objects.filter(is_active=True).values_list('id', flat=True))
+    kinds = ['subject', 'syllabus', 'questionbank', 'chapter', 'viva', 'textbook', 'practical']
+
+    queries = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.4:
+            q = rng.choice(hot)
+        elif roll < 0.7:
+            q = rng.choice(TOPIC_WORDS)
+        elif roll < 0.9:
+            q = ' '.join(rng.sample(TOPIC_WORDS, 2))
+        else:
+            q = rng.choice(TOPIC_WORDS)[:4]
+        params = {'q': q}
+        if faculty_ids and rng.random() < 0.3:
+            params['faculty'] = str(rng.choice(faculty_ids))
+        if rng.random() < 0.2:
+            params['level'] = str(rng.randint(1, 8))
+        if rng.random() < 0.2:
+            params['type'] = rng.choice(kinds)
+        queries.append(params)
+    return queries
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies: List[float], query_counts: List[int]) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+        'mean_queries': round(statistics.fmean(query_counts), 2),
+        'max_queries': max(query_counts),
+    }
+
+
+def _measure(calls: List[Callable[[], Any]], use_cache: bool) -> Dict[str, Any]:
+    latencies, query_counts = [], []
+    for call in calls:
+        if not use_cache:
+            bump_content_version()
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+        query_counts.append(len(queries))
+    return _summarize(latencies, query_counts)
+
+
+def run_benchmark(queries: List[Dict[str, str]], user, use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Replay `queries` through each search entry point
+
+    Args:
+        queries: Parameters from build_query_mix()
+        user: User the view requests are made as
+        use_cache (bool): Keep result caches; False bumps the content
+            version before every request
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Latency percentiles and query counts per entry point
+    """
+    from .search_utils import perform_enhanced_search
+    from .views import search, advanced_search
+
+    factory = RequestFactory()
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def view_call(view, path, params):
+        def call():
+            request = factory.get(path, params)
+            request.user = user
+            request.session = session_store()
+            return view(request)
+        return call
+
+    advanced_types = ['note', 'syllabus', 'questionbank']
+    sorts = ['relevance', 'relevance', 'newest', 'downloads', 'views']
+    advanced_params = [
+        {
+            'query': params['q'],
+            'sort_by': sorts[i % len(sorts)],
+            **({'resource_type': advanced_types[i % 3]} if i % 4 == 0 else {}),
+        }
+        for i, params in enumerate(queries)
+    ]
+
+    enhanced_corpus = [
+        resource
+        for model in (Note, Syllabus, QuestionBank)
+        for resource in model.objects.filter(status='approved').select_related('subject__faculty')
+    ]
+
+    return {
+        'search': _measure([view_call(search, '/search/', params) for params in queries], use_cache),
+        'advanced_search': _measure(
+            [view_call(advanced_search, '/advanced-search/', params) for params in advanced_params], use_cache
+        ),
+        'perform_enhanced_search': _measure(
+            [lambda q=params['q']: perform_enhanced_search(q, enhanced_corpus) for params in queries], use_cache
+        ),
+    }
@@ -0,0 +1,53 @@
+"""
+Cache Utilities for Student Portal
+
+Cached data derived from the resource catalogue (admin statistics, search
+results, ...) is stored under keys that include a global content version.
+Model signals bump the version whenever resources, subjects or faculties
+change, which makes every such cache entry unreachable at once without having
+to know or delete the individual keys.
+
+The version lives in the default cache, so a bump reaches exactly the
+processes that share it. With REDIS_URL that is every web worker and cron
+job. Without it (LocMemCache) a bump only invalidates the cache of the
+process that made the change; the others keep serving their entries until
+they expire, which is why the versioned timeouts are short in that setup
+(see SHARED_CACHE in settings).
+"""
+
+import time
+
+from django.core.cache import cache
+
+CONTENT_VERSION_KEY = 'content_version'
+
+
+def get_content_version():
+    """
+    Current content version
+
+    A missing version (first use, cache eviction or restart) is initialised
+    from the clock, so it never goes back to a value whose entries may still
+    be cached.
+
+    Returns:
+        int: Version number to embed in cache keys
+    """
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version():
+    """Invalidate all content-versioned cache entries"""
+    try:
+        return cache.incr(CONTENT_VERSION_KEY)
+    except ValueError:
+        return get_content_version()
+
+
+def versioned_key(prefix):
+    """Cache key for `prefix` under the current content version"""
+    return f"{prefix}:v{get_content_version()}"
@@ -0,0 +1,206 @@
+"""
+Collaborative Filtering for Student Portal
+
+Item-item neighbours from co-usage: two resources are similar when the same
+students view and download both. Built offline by
+``python manage.py build_similarity --method collaborative``:
+
+1. ViewLog and DownloadLog rows are aggregated per (user, resource) in the
+   database and turned into a sparse user x resource matrix (downloads count
+   double, counts are log-damped so one heavy user cannot dominate).
+2. Resource columns are L2-normalized, so a product of two columns is their
+   cosine similarity.
+3. Per faculty, neighbours are computed in chunks of
+   COLLABORATIVE_CHUNK_SIZE resources (one sparse product per chunk) and the
+   top-K above COLLABORATIVE_MIN_SCORE are stored in ResourceSimilarity with
+   method='collaborative'.
+
+At request time get_personalized_recommendations() only reads those rows.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Faculty, ViewLog, DownloadLog, ResourceSimilarity, RESOURCE_MODELS
+
+# Interaction weights, mirroring the trending engine
+VIEW_WEIGHT = 1.0
+DOWNLOAD_WEIGHT = 2.0
+
+
+def _approved_resources():
+    """(content_type, id) -> faculty_id of every approved resource with a faculty"""
+    faculties = {}
+    for content_type, model in RESOURCE_MODELS.items():
+        rows = model.objects.filter(status='approved', subject__faculty__isnull=False).values_list(
+            'id', 'subject__faculty_id'
+        )
+        for content_id, faculty_id in rows.iterator():
+            faculties[(content_type, content_id)] = faculty_id
+    return faculties
+
+
+def interaction_matrix(days=None):
+    """
+    Sparse user x resource interaction matrix of approved resources
+
+    Args:
+        days: Only use activity from the last `days` days (all history if None)
+
+    Returns:
+        Tuple (matrix, items, item_faculty): CSR matrix of shape
+        (users, resources), the (content_type, id) key of every column and the
+        faculty id of every column. The matrix is None without interactions.
+    """
+    from scipy import sparse
+
+    resources = _approved_resources()
+    since = timezone.now() - timedelta(days=days) if days else None
+
+    weights = defaultdict(float)
+    for log_model, time_field, weight in (
+        (ViewLog, 'viewed_at', VIEW_WEIGHT),
+        (DownloadLog, 'downloaded_at', DOWNLOAD_WEIGHT),
+    ):
+        logs = log_model.objects.filter(user__isnull=False, content_type__in=list(RESOURCE_MODELS))
+        if since:
+            logs = logs.filter(**{f'{time_field}__gte': since})
+        grouped = logs.values('user_id', 'content_type', 'content_id').annotate(events=Count('id')).order_by()
+        for row in grouped.iterator():
+            key = (row['content_type'], row['content_id'])
+            if key in resources:
+                weights[(row['user_id'], key)] += weight * row['events']
+
+    if not weights:
+        return None, [], []
+
+    users, items = {}, {}
+    rows, columns, values = [], [], []
+    for (user_id, key), weight in weights.items():
+        rows.append(users.setdefault(user_id, len(users)))
+        columns.append(items.setdefault(key, len(items)))
+        values.append(math.log1p(weight))
+
+    matrix = sparse.csr_matrix((values, (rows, columns)), shape=(len(users), len(items)))
+    item_keys = list(items)
+    return matrix, item_keys, [resources[key] for key in item_keys]
+
+
+def _normalized_item_vectors(matrix):
+    """Resource x user matrix with L2-normalized rows"""
+    import numpy as np
+    from scipy import sparse
+
+    vectors = matrix.T.tocsr()
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ vectors
+
+
+def build_collaborative_tables(top_k=None, faculty=None):
+    """
+    Precompute collaborative top-K neighbours of every used resource
+
+    Neighbours are restricted to the resource's own faculty, like the
+    content-based table. Each faculty's collaborative rows are replaced.
+
+    Args:
+        top_k: Neighbours stored per resource (defaults to RESOURCE_SIMILARITY_TOP_K)
+        faculty: Only rebuild this faculty
+
+    Returns:
+        Dict of faculty -> number of rows written
+    """
+    import numpy as np
+    from scipy import sparse
+    from .recommend_utils import _top_neighbours
+
+    top_k = top_k or getattr(settings, 'RESOURCE_SIMILARITY_TOP_K', 10)
+    chunk_size = getattr(settings, 'COLLABORATIVE_CHUNK_SIZE', 1000)
+    min_score = getattr(settings, 'COLLABORATIVE_MIN_SCORE', 0.05)
+
+    matrix, items, item_faculty = interaction_matrix(getattr(settings, 'COLLABORATIVE_HISTORY_DAYS', None))
+    vectors = _normalized_item_vectors(matrix) if matrix is not None else None
+    item_faculty = np.asarray(item_faculty)
+
+    faculties = Faculty.objects.filter(is_active=True).order_by('name')
+    if faculty is not None:
+        faculties = faculties.filter(pk=faculty.pk)
+
+    written = {}
+    for current in faculties:
+        rows = []
+        columns = np.flatnonzero(item_faculty == current.id) if vectors is not None else []
+        if len(columns) > 1:
+            faculty_vectors = vectors[columns]
+            for start in range(0, len(columns), chunk_size):
+                # (chunk x users) . (users x faculty resources): cosine similarities,
+                # without each resource's similarity to itself
+                similarities = (faculty_vectors[start:start + chunk_size] @ faculty_vectors.T).tocsr()
+                self_similarity = sparse.diags(
+                    similarities.diagonal(k=start), offsets=start, shape=similarities.shape
+                )
+                similarities = (similarities - self_similarity).tocsr()
+                similarities.eliminate_zeros()
+                for offset in range(similarities.shape[0]):
+                    content_type, content_id = items[columns[start + offset]]
+                    for column, score in _top_neighbours(similarities, offset, top_k, min_score):
+                        similar_content_type, similar_content_id = items[columns[column]]
+                        rows.append(ResourceSimilarity(
+                            faculty=current,
+                            method='collaborative',
+                            content_type=content_type,
+                            content_id=content_id,
+                            similar_content_type=similar_content_type,
+                            similar_content_id=similar_content_id,
+                            score=score,
+                        ))
+
+        with transaction.atomic():
+            ResourceSimilarity.objects.filter(faculty=current, method='collaborative').delete()
+            ResourceSimilarity.objects.bulk_create(rows, batch_size=1000)
+        written[current] = len(rows)
+    return written
+
+
+def collaborative_candidates(keys, exclude=(), limit=5):
+    """
+    Score resources by their collaborative similarity to `keys`
+
+    Args:
+        keys: (content_type, id) keys of resources the user accessed
+        exclude: Keys that must not be recommended
+        limit: Maximum number of candidates
+
+    Returns:
+        List of ((content_type, id), score, source key) tuples, best first;
+        `source` is the accessed resource contributing most to the score
+    """
+    ids_by_type = defaultdict(list)
+    for content_type, content_id in keys:
+        ids_by_type[content_type].append(content_id)
+    if not ids_by_type:
+        return []
+
+    scores = defaultdict(float)
+    best_source = {}
+    for content_type, ids in ids_by_type.items():
+        neighbours = ResourceSimilarity.objects.filter(
+            method='collaborative', content_type=content_type, content_id__in=ids
+        ).values_list('content_id', 'similar_content_type', 'similar_content_id', 'score')
+        for content_id, similar_content_type, similar_content_id, score in neighbours:
+            candidate = (similar_content_type, similar_content_id)
+            if candidate in exclude:
+                continue
+            scores[candidate] += score
+            if score > best_source.get(candidate, (0, None))[0]:
+                best_source[candidate] = (score, (content_type, content_id))
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+    return [(candidate, score, best_source[candidate][1]) for candidate, score in ranked]
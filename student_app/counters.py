@@ -0,0 +1,192 @@
+"""
+Counter Service for Student Portal
+
+View, download and similar counters are incremented on every hit. Doing that
+with a read-modify-write ``save()`` loses updates under concurrency and makes
+every request take a row lock on the hottest resources.
+
+This module applies increments as atomic ``F()`` expressions instead. In the
+default buffered mode, deltas are accumulated in process and flushed every
+COUNTER_FLUSH_INTERVAL seconds (or once COUNTER_MAX_PENDING rows are waiting)
+as one ``UPDATE ... SET count = count + CASE ...`` statement per model and
+field set. Deltas of a failed UPDATE go back into the buffer and are retried
+with the next flush. Set COUNTER_BUFFERING = False to write each increment
+immediately.
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, DateTimeField, F, IntegerField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# (model class, primary key) -> {counter field: delta}
+_pending_deltas: Dict[Tuple[type, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+# (model class, primary key) -> {timestamp field: latest value}
+_pending_touches: Dict[Tuple[type, int], Dict[str, object]] = defaultdict(dict)
+_pending_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+stats = {'flushed_rows': 0, 'flushed_statements': 0}
+
+
+def buffering_enabled() -> bool:
+    return getattr(settings, 'COUNTER_BUFFERING', True)
+
+
+def increment(instance, field: str, delta: int = 1, touch: Iterable[str] = ()) -> None:
+    """
+    Atomically add `delta` to a counter field of a model instance
+
+    The in-memory instance is updated as well, so callers can keep
+    rendering the new value.
+
+    Args:
+        instance: Saved model instance
+        field (str): Name of the integer counter field
+        delta (int): Amount to add
+        touch (Iterable[str]): Timestamp fields to set to the current time
+    """
+    now = timezone.now()
+    setattr(instance, field, (getattr(instance, field) or 0) + delta)
+    for name in touch:
+        setattr(instance, name, now)
+
+    if not buffering_enabled():
+        values = {field: F(field) + delta}
+        values.update({name: now for name in touch})
+        type(instance)._default_manager.filter(pk=instance.pk).update(**values)
+        return
+
+    key = (type(instance), instance.pk)
+    with _pending_lock:
+        _pending_deltas[key][field] += delta
+        for name in touch:
+            _pending_touches[key][name] = now
+        pending = len(_pending_deltas)
+        if pending < getattr(settings, 'COUNTER_MAX_PENDING', 500):
+            _schedule_flush()
+            return
+    flush_counters()
+
+
+def _schedule_flush() -> None:
+    """Start the flush timer if one is not already running (caller holds the lock)"""
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(
+            getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5.0),
+            _flush_in_background
+        )
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def _flush_in_background() -> None:
+    try:
+        flush_counters()
+    except Exception as e:
+        logger.error(f"Counter flush failed: {e}")
+    finally:
+        # The timer thread opened its own connection
+        connections.close_all()
+
+
+def _take_pending():
+    global _flush_timer
+    with _pending_lock:
+        deltas = {key: dict(fields) for key, fields in _pending_deltas.items()}
+        touches = dict(_pending_touches)
+        _pending_deltas.clear()
+        _pending_touches.clear()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+    return deltas, touches
+
+
+def _restore_pending(model, pks, deltas, touches) -> None:
+    """Put the values of rows that could not be written back into the buffer"""
+    with _pending_lock:
+        for pk in pks:
+            key = (model, pk)
+            for field, delta in deltas[key].items():
+                _pending_deltas[key][field] += delta
+            for name, value in touches.get(key, {}).items():
+                current = _pending_touches[key].get(name)
+                _pending_touches[key][name] = value if current is None else max(current, value)
+        _schedule_flush()
+
+
+def flush_counters() -> int:
+    """
+    Write all buffered deltas to the database
+
+    Rows are grouped by model and by the set of fields they touch, and each
+    group is written with a single UPDATE using CASE expressions. Groups
+    whose UPDATE fails are put back into the buffer.
+
+    Returns:
+        int: Number of rows updated
+    """
+    deltas, touches = _take_pending()
+    if not deltas:
+        return 0
+
+    groups = defaultdict(list)
+    for (model, pk), fields in deltas.items():
+        touched = tuple(sorted(touches.get((model, pk), {})))
+        groups[(model, tuple(sorted(fields)), touched)].append(pk)
+
+    rows = statements = 0
+    batch_size = getattr(settings, 'COUNTER_FLUSH_BATCH_SIZE', 200)
+    for (model, fields, touched), group_pks in groups.items():
+        for start in range(0, len(group_pks), batch_size):
+            pks = group_pks[start:start + batch_size]
+            if _update_rows(model, pks, fields, touched, deltas, touches):
+                rows += len(pks)
+                statements += 1
+            else:
+                _restore_pending(model, pks, deltas, touches)
+
+    stats['flushed_rows'] += rows
+    stats['flushed_statements'] += statements
+    return rows
+
+
+def _update_rows(model, pks, fields, touched, deltas, touches) -> bool:
+    """Apply the buffered values of `pks` with one UPDATE statement (False if it failed)"""
+    values = {}
+    for field in fields:
+        values[field] = F(field) + Case(
+            *[When(pk=pk, then=Value(deltas[(model, pk)][field])) for pk in pks],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    for name in touched:
+        values[name] = Case(
+            *[When(pk=pk, then=Value(touches[(model, pk)][name])) for pk in pks],
+            default=F(name),
+            output_field=DateTimeField(),
+        )
+    try:
+        model._default_manager.filter(pk__in=pks).update(**values)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to flush {model.__name__} counters for {len(pks)} rows: {e}")
+        return False
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        flush_counters()
+    except Exception as e:
+        logger.error(f"Counter flush at exit failed: {e}")
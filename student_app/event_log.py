@@ -0,0 +1,242 @@
+"""
+Event Logging Pipeline for Student Portal
+
+ViewLog and DownloadLog rows are analytics, so request handlers should not wait
+for their INSERTs. Views enqueue log records with log_view()/log_download()
+and a background thread writes them with bulk_create in batches of
+EVENT_LOG_BATCH_SIZE, at least every EVENT_LOG_FLUSH_INTERVAL seconds, and
+once more when the worker process exits: the flusher thread is stopped and
+joined (for up to EVENT_LOG_EXIT_TIMEOUT seconds) so the batch it holds is
+written, then whatever is still queued is written by the exiting thread.
+
+A batch whose bulk_create fails is put back into the queue and retried, up
+to EVENT_LOG_MAX_RETRIES times, before its events are counted as failed.
+
+The queue is bounded (EVENT_LOG_QUEUE_SIZE); when it is full, events are
+dropped and counted rather than blocking the request. Set
+EVENT_LOG_ASYNC = False to write every event synchronously.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import DownloadLog, ViewLog
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[queue.Queue] = None
+_worker: Optional[threading.Thread] = None
+_worker_pid: Optional[int] = None
+_worker_lock = threading.Lock()
+
+# Queued to make the flusher thread write its batch and stop
+_STOP = object()
+
+_metrics_lock = threading.Lock()
+_metrics = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'retried': 0, 'batches': 0}
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def get_metrics() -> Dict[str, int]:
+    """
+    Snapshot of the pipeline counters for this process
+
+    Returns:
+        Dict[str, int]: enqueued/flushed/dropped/failed/retried events,
+        written batches and the current queue size
+    """
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    metrics['queued'] = _queue.qsize() if _queue is not None else 0
+    return metrics
+
+
+def _ensure_worker() -> queue.Queue:
+    """Start the flusher thread for this process (again after a fork)"""
+    global _queue, _worker, _worker_pid
+    if _worker_pid == os.getpid() and _worker is not None and _worker.is_alive():
+        return _queue
+    with _worker_lock:
+        if _worker_pid != os.getpid() or _worker is None or not _worker.is_alive():
+            if _worker_pid != os.getpid() or _queue is None:
+                _queue = queue.Queue(maxsize=getattr(settings, 'EVENT_LOG_QUEUE_SIZE', 10000))
+            _worker = threading.Thread(target=_run_worker, name='event-log-flusher', daemon=True)
+            _worker_pid = os.getpid()
+            _worker.start()
+    return _queue
+
+
+def _enqueue(record) -> None:
+    if not getattr(settings, 'EVENT_LOG_ASYNC', True):
+        _write_batch([record], retry=False)
+        return
+    try:
+        _ensure_worker().put_nowait(record)
+        _count('enqueued')
+    except queue.Full:
+        _count('dropped')
+        logger.warning(f"Event log queue full, dropped {type(record).__name__}")
+
+
+def log_view(user, content_type: str, content_id: int, ip_address: Optional[str] = None) -> None:
+    """
+    Record a view without writing to the database in the request
+
+    Args:
+        user: User who viewed the content (may be None)
+        content_type (str): Logged content type, e.g. 'note' or 'subject'
+        content_id (int): Primary key of the viewed object
+        ip_address (Optional[str]): Client address
+    """
+    _enqueue(ViewLog(
+        user_id=getattr(user, 'pk', None),
+        content_type=content_type,
+        content_id=content_id,
+        viewed_at=timezone.now(),
+        ip_address=ip_address,
+    ))
+
+
+def log_download(user, content_type: str, content_id: int, ip_address: Optional[str] = None) -> None:
+    """
+    Record a download without writing to the database in the request
+
+    Args:
+        user: User who downloaded the content
+        content_type (str): Logged content type, e.g. 'note' or 'chapter'
+        content_id (int): Primary key of the downloaded object
+        ip_address (Optional[str]): Client address
+    """
+    _enqueue(DownloadLog(
+        user_id=user.pk,
+        content_type=content_type,
+        content_id=content_id,
+        downloaded_at=timezone.now(),
+        ip_address=ip_address,
+    ))
+
+
+def _write_batch(records: List, retry: bool = True) -> None:
+    """Insert queued records with one bulk_create per log model"""
+    by_model = defaultdict(list)
+    for record in records:
+        by_model[type(record)].append(record)
+    for model, rows in by_model.items():
+        try:
+            model.objects.bulk_create(rows, batch_size=getattr(settings, 'EVENT_LOG_BATCH_SIZE', 200))
+            _count('flushed', len(rows))
+            _count('batches')
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} {model.__name__} rows: {e}")
+            if retry:
+                _requeue(rows)
+            else:
+                _count('failed', len(rows))
+
+
+def _requeue(rows: List) -> None:
+    """Put the rows of a failed batch back into the queue, until they ran out of retries"""
+    max_retries = getattr(settings, 'EVENT_LOG_MAX_RETRIES', 3)
+    for row in rows:
+        row._event_log_attempts = getattr(row, '_event_log_attempts', 0) + 1
+        if row._event_log_attempts > max_retries:
+            _count('failed')
+            continue
+        try:
+            _queue.put_nowait(row)
+            _count('retried')
+        except queue.Full:
+            _count('failed')
+
+
+def _drain(records: List, limit: int) -> List:
+    while len(records) < limit:
+        try:
+            record = _queue.get_nowait()
+        except queue.Empty:
+            break
+        if record is not _STOP:
+            records.append(record)
+    return records
+
+
+def _run_worker() -> None:
+    batch_size = getattr(settings, 'EVENT_LOG_BATCH_SIZE', 200)
+    interval = getattr(settings, 'EVENT_LOG_FLUSH_INTERVAL', 2.0)
+    stopping = False
+    while not stopping:
+        # Block until there is something to write, then collect for up to
+        # `interval` seconds or until a full batch is ready
+        records = []
+        record = _queue.get()
+        deadline = time.monotonic() + interval
+        while True:
+            if record is _STOP:
+                stopping = True
+                break
+            records.append(record)
+            remaining = deadline - time.monotonic()
+            if len(records) >= batch_size or remaining <= 0:
+                break
+            try:
+                record = _queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if records:
+            close_old_connections()
+            _write_batch(records)
+
+
+def flush_event_log() -> int:
+    """
+    Write everything currently queued from the calling thread
+
+    Returns:
+        int: Number of records taken from the queue
+    """
+    if _queue is None or _worker_pid != os.getpid():
+        return 0
+    batch_size = getattr(settings, 'EVENT_LOG_BATCH_SIZE', 200)
+    total = 0
+    while True:
+        records = _drain([], batch_size)
+        if not records:
+            return total
+        _write_batch(records)
+        total += len(records)
+
+
+def _stop_worker(timeout: float) -> None:
+    """Let the flusher thread write the batch it holds and exit"""
+    if _worker is None or _worker_pid != os.getpid() or not _worker.is_alive():
+        return
+    try:
+        _queue.put(_STOP, timeout=timeout)
+    except queue.Full:
+        return
+    _worker.join(timeout)
+    if _worker.is_alive():
+        logger.warning("Event log flusher did not stop in time; its current batch may be lost")
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        _stop_worker(getattr(settings, 'EVENT_LOG_EXIT_TIMEOUT', 5.0))
+        flush_event_log()
+    except Exception as e:
+        logger.error(f"Event log flush at exit failed: {e}")
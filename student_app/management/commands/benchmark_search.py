@@ -0,0 +1,58 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from student_app.benchmark import build_query_mix, generate_corpus, run_benchmark
+from student_app.cache_utils import bump_content_version
+from student_app.search_index import SearchIndex, activate_search_index
+
+
+class Command(BaseCommand):
+    help = ('Benchmark search on a synthetic corpus and print p50/p95/p99 latency and query counts as JSON '
+            '(the corpus is rolled back afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resources', type=int, default=20000, help='Synthetic resources to generate')
+        parser.add_argument('--faculties', type=int, default=4, help='Synthetic faculties to generate')
+        parser.add_argument('--queries', type=int, default=200, help='Queries to replay per entry point')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for corpus and query mix')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Invalidate result caches before every request')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stderr.write("Generating synthetic corpus...")
+            corpus = generate_corpus(options['resources'], options['faculties'], seed=options['seed'])
+            bump_content_version()
+
+            self.stderr.write("Building search index...")
+            index = SearchIndex.build()
+            activate_search_index(index)
+
+            user = User.objects.create_user(f"benchmark-{options['seed']}-{id(corpus)}")
+            queries = build_query_mix(options['queries'], seed=options['seed'])
+            self.stderr.write(f"Replaying {len(queries)} queries...")
+            results = run_benchmark(queries, user, use_cache=not options['no_cache'])
+
+            transaction.set_rollback(True)
+
+        # Cached entries and the in-memory index may reference rolled back rows
+        bump_content_version()
+        activate_search_index(SearchIndex.load())
+
+        report = {
+            'database': connection.vendor,
+            'corpus': corpus,
+            'indexed_resources': len(index),
+            'queries': len(queries),
+            'cache': not options['no_cache'],
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
@@ -0,0 +1,52 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Modules that dominate import time when loaded eagerly
+HEAVY_MODULES = ('sklearn', 'scipy', 'numpy', 'nltk', 'joblib')
+
+# Run in a fresh interpreter: what a worker does before its first request
+WORKER_BOOT = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+if {preload!r}:
+    import nltk, sklearn.feature_extraction.text, sklearn.metrics.pairwise
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure worker startup time (Django setup and URLconf import) in fresh interpreters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Interpreters to start per mode (default: 5)')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        for label, preload in (('lazy (current)', False), ('eager ML/NLP imports', True)):
+            timings, loaded = [], []
+            for _ in range(options['runs']):
+                script = WORKER_BOOT.format(preload=preload, heavy=HEAVY_MODULES)
+                output = subprocess.run(
+                    [sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR,
+                    capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                timings.append(result['seconds'])
+                loaded = result['loaded']
+            self.stdout.write(
+                f"{label}: median {statistics.median(timings) * 1000:.0f} ms, "
+                f"min {min(timings) * 1000:.0f} ms over {len(timings)} runs; "
+                f"heavy modules loaded: {', '.join(loaded) or 'none'}"
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Startup benchmark complete"))
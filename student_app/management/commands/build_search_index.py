@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.search_index import SearchIndex, get_index_path, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the persistent TF-IDF search index over approved resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-missing', action='store_true',
+                            help='Keep an existing index file and only build when there is none (web start)')
+
+    def handle(self, *args, **options):
+        if options['if_missing'] and SearchIndex.load() is not None:
+            self.stdout.write(self.style.SUCCESS(f"✅ Search index already built at {get_index_path()}"))
+            return
+
+        self.stdout.write("Building search index...")
+
+        try:
+            index = rebuild_search_index()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        vocabulary_size = len(index.count_vectorizer.vocabulary_)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indexed {len(index)} resources ({vocabulary_size} terms)"
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.collaborative import build_collaborative_tables
+from student_app.models import Faculty
+from student_app.recommend_utils import build_similarity_table
+
+
+class Command(BaseCommand):
+    help = 'Precompute the per-faculty top-K similar resource tables used by recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faculty', help='Only rebuild the faculty with this slug')
+        parser.add_argument('--top-k', type=int, default=None, help='Neighbours to keep per resource')
+        parser.add_argument('--method', choices=['content', 'collaborative', 'all'], default='all',
+                            help='Content-based (TF-IDF), collaborative (co-usage) or both tables')
+
+    def handle(self, *args, **options):
+        faculties = Faculty.objects.filter(is_active=True).order_by('name')
+        if options['faculty']:
+            faculties = faculties.filter(slug=options['faculty'])
+            if not faculties.exists():
+                raise CommandError(f"Faculty '{options['faculty']}' not found")
+
+        total = 0
+        if options['method'] in ('content', 'all'):
+            for faculty in faculties:
+                rows = build_similarity_table(faculty, top_k=options['top_k'])
+                total += rows
+                self.stdout.write(f"{faculty.name}: {rows} content similarity rows")
+
+        if options['method'] in ('collaborative', 'all'):
+            only = faculties.first() if options['faculty'] else None
+            for current, rows in build_collaborative_tables(top_k=options['top_k'], faculty=only).items():
+                total += rows
+                self.stdout.write(f"{current.name}: {rows} collaborative similarity rows")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Stored {total} similarity rows"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from student_app.models import RESOURCE_MODELS
+from student_app.text_extraction import extract_all
+
+
+class Command(BaseCommand):
+    help = 'Extract searchable text from uploaded resource PDFs (unchanged files are skipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='types', choices=sorted(RESOURCE_MODELS),
+                            help='Resource type to process (repeatable, default: all)')
+        parser.add_argument('--force', action='store_true', help='Re-extract files whose hash is unchanged')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Extracting resource text...")
+        outcome = extract_all(options['types'], force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Extracted {outcome['extracted']} files "
+            f"({outcome['unchanged']} unchanged, {outcome['skipped']} skipped, {outcome['failed']} failed)"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from student_app.recommendation_batch import active_user_ids, precompute_user_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute and store the recommendations of every recently active user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Users active in the last N days (default: 30)')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=50, help='Users per worker task (default: 50)')
+        parser.add_argument('--limit', type=int, default=None, help='Recommendations per kind')
+
+    def handle(self, *args, **options):
+        user_ids = active_user_ids(options['days'])
+        self.stdout.write(f"Precomputing recommendations for {len(user_ids)} users...")
+        stored, failed = precompute_user_recommendations(
+            user_ids, limit=options['limit'], workers=options['workers'], chunk_size=options['chunk_size']
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} users failed (see log)"))
+        self.stdout.write(self.style.SUCCESS(f"✅ Stored recommendations for {stored} users"))
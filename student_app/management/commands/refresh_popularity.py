@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from student_app.recommend_utils import refresh_resource_popularity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ResourcePopularity table used for trending recommendations'
+
+    def handle(self, *args, **options):
+        rows = refresh_resource_popularity()
+        self.stdout.write(self.style.SUCCESS(f"✅ Refreshed popularity for {rows} resources"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from student_app.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    help = 'Decay trending scores and add view/download activity logged since the last pass'
+
+    def handle(self, *args, **options):
+        result = update_trending_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Processed {result['events']} new events "
+            f"({result['resources']} resources, {result['subjects']} subjects updated)"
+        ))
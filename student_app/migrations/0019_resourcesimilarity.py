@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0018_merge_20250918_0014'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=20)),
+                ('content_id', models.PositiveIntegerField()),
+                ('similar_content_type', models.CharField(max_length=20)),
+                ('similar_content_id', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('faculty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resource_similarities', to='student_app.faculty')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['content_type', 'content_id', '-score'], name='resource_sim_lookup_idx')],
+            },
+        ),
+    ]
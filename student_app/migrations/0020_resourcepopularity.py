@@ -0,0 +1,56 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+RESOURCE_MODEL_NAMES = ['syllabus', 'note', 'questionbank', 'chapter', 'viva', 'textbook', 'practical']
+
+
+def populate_popularity(apps, schema_editor):
+    """Seed the table from the current resource counters"""
+    ResourcePopularity = apps.get_model('student_app', 'ResourcePopularity')
+    rows = []
+    for model_name in RESOURCE_MODEL_NAMES:
+        model = apps.get_model('student_app', model_name)
+        for resource in model.objects.filter(status='approved').select_related('subject'):
+            if model_name == 'viva':
+                score = resource.view_count * 1.5
+            else:
+                score = resource.view_count + resource.download_count * 2
+            rows.append(ResourcePopularity(
+                content_type=model_name,
+                content_id=resource.id,
+                faculty_id=resource.subject.faculty_id,
+                score=score,
+                last_viewed=resource.last_viewed,
+            ))
+    ResourcePopularity.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0019_resourcesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourcePopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=20)),
+                ('content_id', models.PositiveIntegerField()),
+                ('score', models.FloatField(default=0, help_text='view_count + 2 * download_count (1.5 * view_count for vivas)')),
+                ('last_viewed', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('faculty', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resource_popularity', to='student_app.faculty')),
+            ],
+            options={
+                'verbose_name_plural': 'Resource popularity',
+                'indexes': [models.Index(fields=['faculty', '-score'], name='popularity_faculty_score_idx'), models.Index(fields=['-score'], name='popularity_score_idx')],
+                'unique_together': {('content_type', 'content_id')},
+            },
+        ),
+        migrations.RunPython(populate_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+RESOURCE_MODEL_NAMES = ['syllabus', 'note', 'questionbank', 'chapter', 'viva', 'textbook', 'practical']
+
+
+def populate_subjects(apps, schema_editor):
+    """Fill in the subject of existing popularity rows"""
+    ResourcePopularity = apps.get_model('student_app', 'ResourcePopularity')
+    for model_name in RESOURCE_MODEL_NAMES:
+        model = apps.get_model('student_app', model_name)
+        for subject_id, ids in _ids_by_subject(model).items():
+            ResourcePopularity.objects.filter(
+                content_type=model_name, content_id__in=ids
+            ).update(subject_id=subject_id)
+
+
+def _ids_by_subject(model):
+    ids_by_subject = {}
+    for resource_id, subject_id in model.objects.values_list('id', 'subject_id'):
+        ids_by_subject.setdefault(subject_id, []).append(resource_id)
+    return ids_by_subject
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0020_resourcepopularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubjectPopularity',
+            fields=[
+                ('subject', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='student_app.subject')),
+                ('trending_score', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Subject popularity',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_view_id', models.BigIntegerField(default=0)),
+                ('last_download_id', models.BigIntegerField(default=0)),
+                ('scored_at', models.DateTimeField(blank=True, help_text='Time all trending scores are decayed to', null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='resourcepopularity',
+            name='subject',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resource_popularity', to='student_app.subject'),
+        ),
+        migrations.AddField(
+            model_name='resourcepopularity',
+            name='trending_score',
+            field=models.FloatField(default=0, help_text='Exponentially decayed view/download activity'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcepopularity',
+            index=models.Index(fields=['faculty', '-trending_score'], name='popularity_faculty_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourcepopularity',
+            index=models.Index(fields=['-trending_score'], name='popularity_trend_idx'),
+        ),
+        migrations.AddField(
+            model_name='subjectpopularity',
+            name='faculty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='subject_popularity', to='student_app.faculty'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectpopularity',
+            index=models.Index(fields=['faculty', '-trending_score'], name='subject_pop_faculty_trend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjectpopularity',
+            index=models.Index(fields=['-trending_score'], name='subject_pop_trend_idx'),
+        ),
+        migrations.RunPython(populate_subjects, migrations.RunPython.noop),
+    ]
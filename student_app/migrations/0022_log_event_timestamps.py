@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0021_trending_scores'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='downloadlog',
+            name='downloaded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='viewlog',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
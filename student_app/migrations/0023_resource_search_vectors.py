@@ -0,0 +1,87 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Body fields weighted B in each resource's search_vector (title is weighted A)
+SEARCH_BODY_FIELDS = {
+    'syllabus': ['content'],
+    'note': ['description'],
+    'questionbank': ['description'],
+    'chapter': ['description'],
+    'viva': ['description', 'question', 'answer'],
+    'textbook': ['description', 'author', 'publisher'],
+    'practical': ['description', 'objective', 'procedure'],
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    """GIN-index and backfill the search vectors (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, body_fields in SEARCH_BODY_FIELDS.items():
+        table = apps.get_model('student_app', model_name)._meta.db_table
+        body = " || ' ' || ".join(f"coalesce({field}, '')" for field in body_fields)
+        schema_editor.execute(
+            f"UPDATE {table} SET search_vector = "
+            f"setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('english', {body}), 'B')"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_search_gin ON {table} USING gin (search_vector)"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name in SEARCH_BODY_FIELDS:
+        table = apps.get_model('student_app', model_name)._meta.db_table
+        schema_editor.execute(f"DROP INDEX IF EXISTS {table}_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0022_log_event_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chapter',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='practical',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='questionbank',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='syllabus',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='textbook',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='viva',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
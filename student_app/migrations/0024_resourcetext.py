@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0023_resource_search_vectors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_type', models.CharField(max_length=20)),
+                ('content_id', models.PositiveIntegerField()),
+                ('file_hash', models.CharField(help_text='SHA-256 of the extracted file', max_length=64)),
+                ('text', models.TextField(blank=True)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('truncated', models.BooleanField(default=False)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('content_type', 'content_id')},
+            },
+        ),
+    ]
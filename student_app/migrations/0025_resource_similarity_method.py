@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0024_resourcetext'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='resourcesimilarity',
+            name='resource_sim_lookup_idx',
+        ),
+        migrations.AddField(
+            model_name='resourcesimilarity',
+            name='method',
+            field=models.CharField(choices=[('content', 'Content (TF-IDF)'), ('collaborative', 'Collaborative (co-views/downloads)')], default='content', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='resourcesimilarity',
+            index=models.Index(fields=['method', 'content_type', 'content_id', '-score'], name='resource_sim_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('student_app', '0025_resource_similarity_method'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='precomputed_recommendations', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('items', models.JSONField(default=dict, help_text='Kind -> [[content_type, id, explanation], ...]')),
+                ('limit', models.PositiveSmallIntegerField(help_text='Recommendations computed per kind')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
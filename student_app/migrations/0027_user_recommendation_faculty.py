@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0026_user_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userrecommendation',
+            name='faculty',
+            field=models.ForeignKey(blank=True, help_text='Faculty whose shared segments complete the lists', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='user_recommendations', to='student_app.faculty'),
+        ),
+        migrations.AlterField(
+            model_name='userrecommendation',
+            name='items',
+            field=models.JSONField(default=dict, help_text="'similar'/'personalized' -> [[content_type, id, explanation], ...]"),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_watermark(apps, schema_editor):
+    """The id watermarks covered every event logged up to the last pass"""
+    TrendingState = apps.get_model('student_app', 'TrendingState')
+    TrendingState.objects.update(events_until=models.F('scored_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0027_user_recommendation_faculty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendingstate',
+            name='events_until',
+            field=models.DateTimeField(blank=True, help_text='Log events up to this time have been scored', null=True),
+        ),
+        migrations.RunPython(copy_watermark, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='trendingstate',
+            name='last_download_id',
+        ),
+        migrations.RemoveField(
+            model_name='trendingstate',
+            name='last_view_id',
+        ),
+        migrations.AlterField(
+            model_name='downloadlog',
+            name='downloaded_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='viewlog',
+            name='viewed_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
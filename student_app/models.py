@@ -5,11 +5,14 @@ from django.utils.text import slugify
 from datetime import timedelta
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from django.contrib.postgres.search import SearchVectorField
 from taggit.managers import TaggableManager
 from django.db.models import Count, Q
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 
+from .counters import increment
+
 # Create your models here.
 class Faculty(models.Model):
     ACADEMIC_STRUCTURE_CHOICES = [
@@ -174,6 +177,7 @@ class Syllabus(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text="Last time this resource was viewed")
@@ -182,13 +186,10 @@ class Syllabus(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
 
 class QuestionBank(models.Model):
@@ -204,6 +205,7 @@ class QuestionBank(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text="Last time this resource was viewed")
@@ -212,13 +214,10 @@ class QuestionBank(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
 
 class QuestionBankSolution(models.Model):
@@ -242,13 +241,10 @@ class QuestionBankSolution(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
     class Meta:
         ordering = ['-created_at']
@@ -269,6 +265,7 @@ class Note(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text="Last time this resource was viewed")
@@ -277,13 +274,10 @@ class Note(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
 
 class Chapter(models.Model):
@@ -300,6 +294,7 @@ class Chapter(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text='Last time this resource was viewed')
@@ -310,17 +305,13 @@ class Chapter(models.Model):
         return f"{self.subject.name} - Chapter {self.chapter_number}: {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
     def increment_student(self):
-        self.student_count += 1
-        self.save(update_fields=['student_count'])
+        increment(self, 'student_count')
 
     class Meta:
         ordering = ['chapter_number']
@@ -343,6 +334,7 @@ class Viva(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text='Last time this resource was viewed')
 
@@ -350,9 +342,7 @@ class Viva(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
     class Meta:
         ordering = ['-created_at']
@@ -375,6 +365,7 @@ class TextBook(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text='Last time this resource was viewed')
@@ -383,13 +374,10 @@ class TextBook(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
     class Meta:
         ordering = ['-created_at']
@@ -420,6 +408,7 @@ class Practical(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager(blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
     download_count = models.PositiveIntegerField(default=0)
     view_count = models.PositiveIntegerField(default=0)
     last_viewed = models.DateTimeField(null=True, blank=True, help_text='Last time this resource was viewed')
@@ -428,18 +417,145 @@ class Practical(models.Model):
         return f"{self.subject.name} - {self.title}"
 
     def increment_download(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        increment(self, 'download_count')
 
     def increment_view(self):
-        self.view_count += 1
-        self.last_viewed = timezone.now()
-        self.save(update_fields=['view_count', 'last_viewed'])
+        increment(self, 'view_count', touch=['last_viewed'])
 
     class Meta:
         ordering = ['-created_at']
 
 
+# Searchable/recommendable resource models keyed by the content_type string used
+# in ViewLog/DownloadLog (which is also each model's ``_meta.model_name``)
+RESOURCE_MODELS = {
+    'syllabus': Syllabus,
+    'note': Note,
+    'questionbank': QuestionBank,
+    'chapter': Chapter,
+    'viva': Viva,
+    'textbook': TextBook,
+    'practical': Practical,
+}
+
+# Body fields of each resource type's search_vector (the title is weighted A, these B)
+SEARCH_BODY_FIELDS = {
+    'syllabus': ['content'],
+    'note': ['description'],
+    'questionbank': ['description'],
+    'chapter': ['description'],
+    'viva': ['description', 'question', 'answer'],
+    'textbook': ['description', 'author', 'publisher'],
+    'practical': ['description', 'objective', 'procedure'],
+}
+
+
+class ResourceSimilarity(models.Model):
+    """Precomputed top-K neighbours of a resource within its faculty"""
+    METHOD_CHOICES = [
+        ('content', 'Content (TF-IDF)'),
+        ('collaborative', 'Collaborative (co-views/downloads)'),
+    ]
+
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='resource_similarities')
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, default='content')
+    content_type = models.CharField(max_length=20)  # key of RESOURCE_MODELS
+    content_id = models.PositiveIntegerField()
+    similar_content_type = models.CharField(max_length=20)
+    similar_content_id = models.PositiveIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['method', 'content_type', 'content_id', '-score'], name='resource_sim_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id} ~ {self.similar_content_type}:{self.similar_content_id} ({self.score:.2f})"
+
+
+class ResourcePopularity(models.Model):
+    """Denormalized popularity of every approved resource, so trending is one LIMIT query"""
+    content_type = models.CharField(max_length=20)  # key of RESOURCE_MODELS
+    content_id = models.PositiveIntegerField()
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True, related_name='resource_popularity')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='resource_popularity')
+    score = models.FloatField(default=0, help_text="view_count + 2 * download_count (1.5 * view_count for vivas)")
+    trending_score = models.FloatField(default=0, help_text="Exponentially decayed view/download activity")
+    last_viewed = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Resource popularity'
+        unique_together = ['content_type', 'content_id']
+        indexes = [
+            models.Index(fields=['faculty', '-score'], name='popularity_faculty_score_idx'),
+            models.Index(fields=['-score'], name='popularity_score_idx'),
+            models.Index(fields=['faculty', '-trending_score'], name='popularity_faculty_trend_idx'),
+            models.Index(fields=['-trending_score'], name='popularity_trend_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id} ({self.score:g})"
+
+
+class SubjectPopularity(models.Model):
+    """Decayed activity of a subject (its resources plus direct subject views)"""
+    subject = models.OneToOneField(Subject, on_delete=models.CASCADE, primary_key=True, related_name='popularity')
+    faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, null=True, blank=True, related_name='subject_popularity')
+    trending_score = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Subject popularity'
+        indexes = [
+            models.Index(fields=['faculty', '-trending_score'], name='subject_pop_faculty_trend_idx'),
+            models.Index(fields=['-trending_score'], name='subject_pop_trend_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject.name} ({self.trending_score:.2f})"
+
+
+class UserRecommendation(models.Model):
+    """Per-user recommendation segments precomputed offline, stored as resource keys"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='precomputed_recommendations')
+    faculty = models.ForeignKey(Faculty, on_delete=models.SET_NULL, null=True, blank=True, related_name='user_recommendations', help_text="Faculty whose shared segments complete the lists")
+    items = models.JSONField(default=dict, help_text="'similar'/'personalized' -> [[content_type, id, explanation], ...]")
+    limit = models.PositiveSmallIntegerField(help_text="Recommendations computed per kind")
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Recommendations of {self.user} ({self.computed_at:%Y-%m-%d %H:%M})"
+
+
+class TrendingState(models.Model):
+    """Watermark of the incremental trending pass (single row)"""
+    events_until = models.DateTimeField(null=True, blank=True, help_text="Log events up to this time have been scored")
+    scored_at = models.DateTimeField(null=True, blank=True, help_text="Time all trending scores are decayed to")
+
+    def __str__(self):
+        return f"Trending state at {self.scored_at}"
+
+
+class ResourceText(models.Model):
+    """Normalized text extracted from a resource's uploaded file"""
+    content_type = models.CharField(max_length=20)
+    content_id = models.PositiveIntegerField()
+    file_hash = models.CharField(max_length=64, help_text="SHA-256 of the extracted file")
+    text = models.TextField(blank=True)
+    page_count = models.PositiveIntegerField(default=0)
+    truncated = models.BooleanField(default=False)
+    extracted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['content_type', 'content_id']
+
+    def __str__(self):
+        return f"{self.content_type}:{self.content_id} ({len(self.text)} chars)"
+
+
 class Subscription(models.Model):
     SUBSCRIPTION_TYPES = (
         ('monthly', 'Monthly'),
@@ -515,12 +631,10 @@ class UserProfile(models.Model):
         return self.role in ['contributor', 'admin'] and self.is_contributor_approved
 
     def increment_uploads(self):
-        self.total_uploads += 1
-        self.save(update_fields=['total_uploads', 'updated_at'])
+        increment(self, 'total_uploads', touch=['updated_at'])
 
     def increment_downloads(self):
-        self.total_downloads += 1
-        self.save(update_fields=['total_downloads', 'updated_at'])
+        increment(self, 'total_downloads', touch=['updated_at'])
 
 
 class DownloadLog(models.Model):
@@ -528,7 +642,7 @@ class DownloadLog(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content_type = models.CharField(max_length=20)  # 'syllabus', 'note', 'questionbank'
     content_id = models.PositiveIntegerField()
-    downloaded_at = models.DateTimeField(auto_now_add=True)
+    downloaded_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)  # set at event time, not insert time
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
@@ -540,7 +654,7 @@ class ViewLog(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     content_type = models.CharField(max_length=20)  # 'syllabus', 'note', 'questionbank'
     content_id = models.PositiveIntegerField()
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    viewed_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)  # set at event time, not insert time
     ip_address = models.GenericIPAddressField(null=True, blank=True)
 
     class Meta:
@@ -573,6 +687,67 @@ def handle_contributor_approval(sender, instance, **kwargs):
         profile.contributor_since = timezone.now()
         profile.save()
 
+# Fields touched by view/download tracking; saving only these is not a content or status change
+COUNTER_FIELDS = {'view_count', 'download_count', 'last_viewed', 'student_count'}
+
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Queue approved/rejected/edited/deleted resources for search re-indexing"""
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    from .search_index import schedule_index_update
+    schedule_index_update(sender._meta.model_name, instance.pk)
+
+def update_resource_popularity(sender, instance, update_fields=None, **kwargs):
+    """Add/remove ResourcePopularity rows when resources are approved, rejected or deleted"""
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        # Counter changes are folded in by the periodic refresh_popularity pass
+        return
+    from .recommend_utils import sync_resource_popularity
+    sync_resource_popularity(instance, deleted=kwargs.get('signal') is post_delete)
+
+def delete_resource_text(sender, instance, **kwargs):
+    """Drop the extracted file text of a deleted resource"""
+    ResourceText.objects.filter(content_type=sender._meta.model_name, content_id=instance.pk).delete()
+
+def extract_resource_file_text(sender, instance, update_fields=None, **kwargs):
+    """Queue text extraction when an approved resource's file may have changed"""
+    if update_fields and not set(update_fields) & {'file', 'status'}:
+        return
+    if instance.status != 'approved' or not instance.file:
+        return
+    from .text_extraction import schedule_text_extraction
+    schedule_text_extraction(sender._meta.model_name, instance.pk)
+
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Recompute the full-text search vector when a resource's text may have changed"""
+    if update_fields and not set(update_fields) & ({'title'} | set(SEARCH_BODY_FIELDS[sender._meta.model_name])):
+        return
+    from .search_backend import update_search_vector
+    update_search_vector(instance)
+
+def bump_content_version(sender, instance, update_fields=None, **kwargs):
+    """Invalidate cached statistics/search data when the catalogue changes"""
+    if update_fields and set(update_fields) <= COUNTER_FIELDS:
+        return
+    from .cache_utils import bump_content_version as bump
+    bump()
+
+for _catalogue_model in [Faculty, Subject]:
+    post_save.connect(bump_content_version, sender=_catalogue_model, dispatch_uid=f'content_version_save_{_catalogue_model._meta.model_name}')
+    post_delete.connect(bump_content_version, sender=_catalogue_model, dispatch_uid=f'content_version_delete_{_catalogue_model._meta.model_name}')
+
+for _resource_model in RESOURCE_MODELS.values():
+    post_save.connect(bump_content_version, sender=_resource_model, dispatch_uid=f'content_version_save_{_resource_model._meta.model_name}')
+    post_delete.connect(bump_content_version, sender=_resource_model, dispatch_uid=f'content_version_delete_{_resource_model._meta.model_name}')
+    post_delete.connect(delete_resource_text, sender=_resource_model, dispatch_uid=f'resource_text_delete_{_resource_model._meta.model_name}')
+    if any(field.name == 'file' for field in _resource_model._meta.fields):
+        post_save.connect(extract_resource_file_text, sender=_resource_model, dispatch_uid=f'resource_text_save_{_resource_model._meta.model_name}')
+    post_save.connect(refresh_search_vector, sender=_resource_model, dispatch_uid=f'search_vector_save_{_resource_model._meta.model_name}')
+    post_save.connect(update_resource_popularity, sender=_resource_model, dispatch_uid=f'popularity_save_{_resource_model._meta.model_name}')
+    post_delete.connect(update_resource_popularity, sender=_resource_model, dispatch_uid=f'popularity_delete_{_resource_model._meta.model_name}')
+    post_save.connect(update_search_index, sender=_resource_model, dispatch_uid=f'search_index_save_{_resource_model._meta.model_name}')
+    post_delete.connect(update_search_index, sender=_resource_model, dispatch_uid=f'search_index_delete_{_resource_model._meta.model_name}')
+
 # Article Models
 class Article(models.Model):
     STATUS_CHOICES = [
@@ -5,9 +5,12 @@ This module provides recommendation algorithms for study materials based on:
 - Faculty-based filtering
 - Popularity-based ranking (views/downloads)
 - Content similarity using TF-IDF + Cosine Similarity
+- Item-item collaborative filtering over co-views and co-downloads
 - User's viewing/download history
 """
 
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Q, Count, Sum, F
 from django.utils import timezone
 from datetime import timedelta
@@ -16,9 +19,94 @@ import math
 
 from .models import (
     Syllabus, Note, QuestionBank, Chapter, Viva, TextBook, Practical, Subject, Faculty, 
-    ViewLog, DownloadLog, UserProfile
+    ViewLog, DownloadLog, UserProfile, ResourceSimilarity, ResourcePopularity, RESOURCE_MODELS
 )
-from .search_utils import get_tfidf_similarity
+from .search_utils import search_engine
+from .collaborative import collaborative_candidates
+
+# Minimum cosine similarity for two resources to count as "similar"
+SIMILARITY_THRESHOLD = 0.1
+
+
+def popularity_score(resource):
+    """
+    Popularity of a resource from its lifetime counters.
+
+    Vivas have no downloads, so their views are weighted 1.5x instead.
+    """
+    if isinstance(resource, Viva):
+        return resource.view_count * 1.5
+    return resource.view_count + resource.download_count * 2
+
+
+def popularity_row(resource):
+    """Unsaved ResourcePopularity row of an approved resource"""
+    return ResourcePopularity(
+        content_type=resource._meta.model_name,
+        content_id=resource.pk,
+        faculty_id=resource.subject.faculty_id,
+        subject_id=resource.subject_id,
+        score=popularity_score(resource),
+        last_viewed=resource.last_viewed,
+    )
+
+
+def sync_resource_popularity(resource, deleted=False):
+    """
+    Keep a resource's ResourcePopularity row in step with its approval status.
+
+    Args:
+        resource: Resource instance that was saved or deleted
+        deleted: True when called for a deleted resource
+    """
+    lookup = {'content_type': resource._meta.model_name, 'content_id': resource.pk}
+    if deleted or resource.status != 'approved':
+        ResourcePopularity.objects.filter(**lookup).delete()
+        return
+    ResourcePopularity.objects.update_or_create(
+        defaults={
+            'faculty_id': resource.subject.faculty_id,
+            'subject_id': resource.subject_id,
+            'score': popularity_score(resource),
+            'last_viewed': resource.last_viewed,
+        },
+        **lookup
+    )
+
+
+def refresh_resource_popularity():
+    """
+    Re-score the ResourcePopularity table from the resource counters.
+
+    Rows are upserted so that decayed trending scores are preserved, and rows
+    of resources that are no longer approved are removed.
+
+    Returns:
+        Number of rows written
+    """
+    rows = []
+    for content_type, model in RESOURCE_MODELS.items():
+        for resource in model.objects.filter(status='approved').select_related('subject'):
+            rows.append(popularity_row(resource))
+
+    with transaction.atomic():
+        for content_type, model in RESOURCE_MODELS.items():
+            ResourcePopularity.objects.filter(content_type=content_type).exclude(
+                content_id__in=model.objects.filter(status='approved').values('id')
+            ).delete()
+        ResourcePopularity.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['content_type', 'content_id'],
+            update_fields=['faculty', 'subject', 'score', 'last_viewed', 'updated_at'],
+        )
+    return len(rows)
+
+
+def _ranked_resources(popularity_rows):
+    """Hydrate ResourcePopularity rows (already ordered and limited) into resources"""
+    return get_resources_by_keys(popularity_rows.values_list('content_type', 'content_id'))
 
 
 def get_trending_resources(faculty, limit=5):
@@ -36,68 +124,11 @@ def get_trending_resources(faculty, limit=5):
     if not faculty:
         return []
     
-    # Get all approved resources for the faculty
-    resources = []
-    
-    # Get syllabi
-    syllabi = Syllabus.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get notes
-    notes = Note.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get question banks
-    question_banks = QuestionBank.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get chapters
-    chapters = Chapter.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get vivas
-    vivas = Viva.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') * 1.5  # Vivas don't have downloads, only views
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get textbooks
-    textbooks = TextBook.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get practicals
-    practicals = Practical.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).select_related('subject').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Combine and sort all resources
-    all_resources = list(syllabi) + list(notes) + list(question_banks) + list(chapters) + list(vivas) + list(textbooks) + list(practicals)
-    all_resources.sort(key=lambda x: x.popularity_score, reverse=True)
+    # One indexed LIMIT query over the materialized popularity table, ranked by
+    # recent (decayed) activity first and lifetime popularity second
+    all_resources = _ranked_resources(
+        ResourcePopularity.objects.filter(faculty=faculty).order_by('-trending_score', '-score', '-last_viewed')[:limit]
+    )
     
     # If no resources in this faculty, try to get some global trending as fallback
     if not all_resources:
@@ -105,26 +136,7 @@ def get_trending_resources(faculty, limit=5):
     
     # Add explanations for each resource
     result = []
-    for resource in all_resources[:limit]:
-        # Add resource type information
-        if isinstance(resource, Syllabus):
-            resource_type = 'syllabus'
-        elif isinstance(resource, Note):
-            resource_type = 'note'
-        elif isinstance(resource, QuestionBank):
-            resource_type = 'questionbank'
-        elif isinstance(resource, Chapter):
-            resource_type = 'chapter'
-        elif isinstance(resource, Viva):
-            resource_type = 'viva'
-        elif isinstance(resource, TextBook):
-            resource_type = 'textbook'
-        elif isinstance(resource, Practical):
-            resource_type = 'practical'
-        else:
-            resource_type = 'unknown'
-        resource.resource_type = resource_type
-        
+    for resource in all_resources:
         # Create appropriate explanation based on resource type
         if hasattr(resource, 'download_count'):
             explanation = f"Trending in {faculty.name} - {resource.view_count} views, {resource.download_count} downloads"
@@ -145,81 +157,13 @@ def get_global_trending_resources(limit=5):
     Returns:
         List of tuples (resource, explanation) sorted by popularity
     """
-    # Get syllabi from all faculties
-    syllabi = Syllabus.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get notes from all faculties
-    notes = Note.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get question banks from all faculties
-    question_banks = QuestionBank.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get chapters from all faculties
-    chapters = Chapter.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get vivas from all faculties
-    vivas = Viva.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') * 1.5
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get textbooks from all faculties
-    textbooks = TextBook.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Get practicals from all faculties
-    practicals = Practical.objects.filter(
-        status='approved'
-    ).select_related('subject', 'subject__faculty').annotate(
-        popularity_score=F('view_count') + F('download_count') * 2
-    ).order_by('-popularity_score', '-last_viewed')[:limit]
-    
-    # Combine and sort all resources
-    all_resources = list(syllabi) + list(notes) + list(question_banks) + list(chapters) + list(vivas) + list(textbooks) + list(practicals)
-    all_resources.sort(key=lambda x: x.popularity_score, reverse=True)
+    all_resources = _ranked_resources(
+        ResourcePopularity.objects.order_by('-trending_score', '-score', '-last_viewed')[:limit]
+    )
     
     # Add explanations for each resource
     result = []
-    for resource in all_resources[:limit]:
-        # Add resource type information
-        if isinstance(resource, Syllabus):
-            resource_type = 'syllabus'
-        elif isinstance(resource, Note):
-            resource_type = 'note'
-        elif isinstance(resource, QuestionBank):
-            resource_type = 'questionbank'
-        elif isinstance(resource, Chapter):
-            resource_type = 'chapter'
-        elif isinstance(resource, Viva):
-            resource_type = 'viva'
-        elif isinstance(resource, TextBook):
-            resource_type = 'textbook'
-        elif isinstance(resource, Practical):
-            resource_type = 'practical'
-        else:
-            resource_type = 'unknown'
-        resource.resource_type = resource_type
-        
+    for resource in all_resources:
         faculty_name = resource.subject.faculty.name if resource.subject and resource.subject.faculty else "Unknown Faculty"
         if hasattr(resource, 'download_count'):
             explanation = f"Popular across all faculties - {faculty_name} - {resource.view_count} views, {resource.download_count} downloads"
@@ -230,12 +174,142 @@ def get_global_trending_resources(limit=5):
     return result
 
 
+def get_resources_by_keys(keys):
+    """
+    Fetch approved resources for a list of (content_type, id) keys.
+
+    Issues one id__in query per resource type and preserves the input order.
+    Keys whose resource is missing or not approved are skipped.
+
+    Args:
+        keys: Iterable of (content_type, id) tuples
+
+    Returns:
+        List of resource instances with ``resource_type`` set
+    """
+    keys = list(keys)
+    ids_by_type = defaultdict(set)
+    for content_type, content_id in keys:
+        if content_type in RESOURCE_MODELS and content_id:
+            ids_by_type[content_type].add(content_id)
+
+    fetched = {}
+    for content_type, ids in ids_by_type.items():
+        model = RESOURCE_MODELS[content_type]
+        for resource in model.objects.filter(id__in=ids, status='approved').select_related('subject__faculty'):
+            resource.resource_type = content_type
+            fetched[(content_type, resource.id)] = resource
+
+    return [fetched[key] for key in keys if key in fetched]
+
+
+def _resource_text(resource):
+    """Text used for content similarity between resources"""
+    return f"{resource.title} {getattr(resource, 'content', '')} {getattr(resource, 'description', '')}"
+
+
+def _faculty_resources(faculty):
+    """All approved resources of a faculty, one query per resource type"""
+    resources = []
+    for content_type, model in RESOURCE_MODELS.items():
+        for resource in model.objects.filter(subject__faculty=faculty, status='approved').select_related('subject__faculty'):
+            resource.resource_type = content_type
+            resources.append(resource)
+    return resources
+
+
+def _similarity_matrix(resources):
+    """
+    Pairwise cosine similarity of resources in one vectorized pass.
+
+    Fits a single TF-IDF vectorizer over all texts and takes one sparse
+    matrix product. The diagonal (self-similarity) is removed.
+
+    Returns:
+        scipy.sparse.csr_matrix of shape (n, n), or None if there is no vocabulary
+    """
+    from scipy import sparse
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    texts = [
+        search_engine.preprocess_document(resource, _resource_text(resource), 'similarity')
+        for resource in resources
+    ]
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
+    try:
+        matrix = vectorizer.fit_transform(texts)  # rows are L2-normalized
+    except ValueError:
+        # Empty vocabulary (no usable text)
+        return None
+    similarities = (matrix @ matrix.T).tocsr()
+    similarities = (similarities - sparse.diags(similarities.diagonal())).tocsr()
+    similarities.eliminate_zeros()
+    return similarities
+
+
+def _top_neighbours(similarities, row, top_k, min_score=SIMILARITY_THRESHOLD):
+    """(column, score) pairs of the top_k neighbours of a row above min_score"""
+    import numpy as np
+
+    start, end = similarities.indptr[row], similarities.indptr[row + 1]
+    columns = similarities.indices[start:end]
+    scores = similarities.data[start:end]
+    keep = scores > min_score
+    columns, scores = columns[keep], scores[keep]
+    if len(scores) > top_k:
+        top = np.argpartition(-scores, top_k)[:top_k]
+        columns, scores = columns[top], scores[top]
+    order = np.argsort(-scores)
+    return list(zip(columns[order].tolist(), scores[order].tolist()))
+
+
+def build_similarity_table(faculty, top_k=None):
+    """
+    Precompute the top-K similar resources of every approved resource in a faculty.
+
+    Replaces the faculty's content rows in ResourceSimilarity.
+
+    Args:
+        faculty: Faculty instance
+        top_k: Neighbours stored per resource (defaults to RESOURCE_SIMILARITY_TOP_K)
+
+    Returns:
+        Number of similarity rows written
+    """
+    top_k = top_k or getattr(settings, 'RESOURCE_SIMILARITY_TOP_K', 10)
+    resources = _faculty_resources(faculty)
+    similarities = _similarity_matrix(resources) if len(resources) > 1 else None
+
+    rows = []
+    if similarities is not None:
+        for i, resource in enumerate(resources):
+            for j, score in _top_neighbours(similarities, i, top_k):
+                other = resources[j]
+                rows.append(ResourceSimilarity(
+                    faculty=faculty,
+                    content_type=resource.resource_type,
+                    content_id=resource.id,
+                    similar_content_type=other.resource_type,
+                    similar_content_id=other.id,
+                    score=score,
+                ))
+
+    with transaction.atomic():
+        ResourceSimilarity.objects.filter(faculty=faculty, method='content').delete()
+        ResourceSimilarity.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
 def get_similar_resources(resource, limit=5):
     """
     Get resources similar to the given resource using TF-IDF + Cosine Similarity.
+
+    Reads the precomputed ResourceSimilarity neighbours (see
+    build_similarity_table). Faculties whose table has not been built yet
+    fall back to a single on-the-fly vectorized pass.
     
     Args:
-        resource: Resource instance (Syllabus, Note, or QuestionBank)
+        resource: Resource instance (Syllabus, Note, QuestionBank, ...)
         limit: Maximum number of similar resources to return
         
     Returns:
@@ -248,103 +322,46 @@ def get_similar_resources(resource, limit=5):
     faculty = resource.subject.faculty if resource.subject else None
     if not faculty:
         return []
-    
-    # Get all approved resources from the same faculty
-    all_resources = []
-    
-    # Get syllabi
-    syllabi = Syllabus.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get notes
-    notes = Note.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get question banks
-    question_banks = QuestionBank.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get chapters
-    chapters = Chapter.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get vivas
-    vivas = Viva.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get textbooks
-    textbooks = TextBook.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    # Get practicals
-    practicals = Practical.objects.filter(
-        subject__faculty=faculty,
-        status='approved'
-    ).exclude(id=resource.id).select_related('subject')
-    
-    all_resources = list(syllabi) + list(notes) + list(question_banks) + list(chapters) + list(vivas) + list(textbooks) + list(practicals)
-    
-    if not all_resources:
+
+    content_type = resource._meta.model_name
+    neighbours = list(ResourceSimilarity.objects.filter(
+        method='content',
+        content_type=content_type,
+        content_id=resource.id
+    ).order_by('-score').values_list('similar_content_type', 'similar_content_id', 'score')[:limit])
+
+    if neighbours:
+        scores = {(ct, cid): score for ct, cid, score in neighbours}
+        similar = [(other, scores[(other.resource_type, other.id)]) for other in get_resources_by_keys(scores)]
+    elif not ResourceSimilarity.objects.filter(faculty=faculty, method='content').exists():
+        similar = _compute_similar_resources(resource, faculty, limit)
+    else:
+        similar = []
+
+    return [
+        (similar_resource, f"Similar to '{resource.title}' - {similarity_score:.1%} content match")
+        for similar_resource, similarity_score in similar
+    ]
+
+
+def _compute_similar_resources(resource, faculty, limit):
+    """Similar resources without a precomputed table (one fit, one product)"""
+    content_type = resource._meta.model_name
+    candidates = [
+        other for other in _faculty_resources(faculty)
+        if not (other.resource_type == content_type and other.id == resource.id)
+    ]
+    if not candidates:
         return []
-    
-    # Prepare content for similarity calculation
-    resource_content = f"{resource.title} {getattr(resource, 'content', '')} {getattr(resource, 'description', '')}"
-    
-    # Calculate similarities
-    similarities = []
-    for other_resource in all_resources:
-        other_content = f"{other_resource.title} {getattr(other_resource, 'content', '')} {getattr(other_resource, 'description', '')}"
-        
-        try:
-            similarity = get_tfidf_similarity(resource_content, other_content)
-            if similarity > 0.1:  # Only include resources with meaningful similarity
-                similarities.append((other_resource, similarity))
-        except Exception:
-            # If similarity calculation fails, skip this resource
-            continue
-    
-    # Sort by similarity score and add explanations
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    result = []
-    for similar_resource, similarity_score in similarities[:limit]:
-        # Add resource type information
-        if isinstance(similar_resource, Syllabus):
-            resource_type = 'syllabus'
-        elif isinstance(similar_resource, Note):
-            resource_type = 'note'
-        elif isinstance(similar_resource, QuestionBank):
-            resource_type = 'questionbank'
-        elif isinstance(similar_resource, Chapter):
-            resource_type = 'chapter'
-        elif isinstance(similar_resource, Viva):
-            resource_type = 'viva'
-        elif isinstance(similar_resource, TextBook):
-            resource_type = 'textbook'
-        elif isinstance(similar_resource, Practical):
-            resource_type = 'practical'
-        else:
-            resource_type = 'unknown'
-        similar_resource.resource_type = resource_type
-        
-        explanation = f"Similar to '{resource.title}' - {similarity_score:.1%} content match"
-        result.append((similar_resource, explanation))
-    
-    return result
+
+    resource.resource_type = content_type
+    similarities = _similarity_matrix([resource] + candidates)
+    if similarities is None:
+        return []
+    return [(candidates[j - 1], score) for j, score in _top_neighbours(similarities, 0, limit)]
 
 
-def get_personalized_recommendations(user, limit=5):
+def get_personalized_recommendations(user, limit=5, user_faculty=None, trending=None):
     """
     Get personalized recommendations based on user's viewing and download history.
     Falls back to global trending if user's faculty has no content.
@@ -352,6 +369,8 @@ def get_personalized_recommendations(user, limit=5):
     Args:
         user: User instance
         limit: Maximum number of recommendations to return
+        user_faculty: The user's faculty (looked up unless `trending` is given)
+        trending: Trending resources of the user's faculty, if already known
         
     Returns:
         List of tuples (resource, explanation) sorted by relevance
@@ -360,69 +379,79 @@ def get_personalized_recommendations(user, limit=5):
         return []
     
     # Get user's faculty (from their profile or recent activity)
-    user_faculty = get_user_faculty(user)
+    if trending is None:
+        user_faculty = get_user_faculty(user)
+
+    def faculty_trending():
+        return trending if trending is not None else get_trending_resources(user_faculty, limit)
     
     # Get user's viewing history (last 30 days)
     thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_views = ViewLog.objects.filter(
+    recent_views = list(ViewLog.objects.filter(
         user=user,
         viewed_at__gte=thirty_days_ago
-    ).order_by('-viewed_at')
+    ).order_by('-viewed_at').only('content_type', 'content_id'))
     
     # Get user's download history (last 30 days)
-    recent_downloads = DownloadLog.objects.filter(
+    recent_downloads = list(DownloadLog.objects.filter(
         user=user,
         downloaded_at__gte=thirty_days_ago
-    ).order_by('-downloaded_at')
+    ).order_by('-downloaded_at').only('content_type', 'content_id'))
     
     # If no recent activity, return trending resources from user's faculty only
-    if not recent_views.exists() and not recent_downloads.exists():
+    if not recent_views and not recent_downloads:
         if user_faculty:
-            return get_trending_resources(user_faculty, limit)
+            return faculty_trending()
         # If no faculty, return empty (strict faculty filtering)
         return []
     
-    # Collect all recently accessed resources
+    # Collect all recently accessed resources (views first, then downloads)
     accessed_resources = []
-    
-    # Process viewed resources
-    for view in recent_views:
-        resource = get_resource_from_log(view)
-        if resource:
-            accessed_resources.append(resource)
-    
-    # Process downloaded resources
-    for download in recent_downloads:
-        resource = get_resource_from_log(download)
-        if resource and resource not in accessed_resources:
+    accessed_keys = set()
+    for resource in resolve_logged_resources(recent_views + recent_downloads):
+        key = (resource.resource_type, resource.id)
+        if key not in accessed_keys:
+            accessed_keys.add(key)
             accessed_resources.append(resource)
     
     if not accessed_resources:
         if user_faculty:
-            return get_trending_resources(user_faculty, limit)
+            return faculty_trending()
         # If no faculty, return empty (strict faculty filtering)
         return []
     
-    # Get similar resources for each accessed resource
+    # Resources co-used with the accessed ones by other students come first
+    seen_keys = set(accessed_keys)
+    unique_similar = []
+    accessed_by_key = {(resource.resource_type, resource.id): resource for resource in accessed_resources}
+    candidates = collaborative_candidates(list(accessed_by_key)[:20], exclude=seen_keys, limit=limit)
+    sources = {candidate: source for candidate, _score, source in candidates}
+    for resource in get_resources_by_keys(sources):
+        key = (resource.resource_type, resource.id)
+        seen_keys.add(key)
+        unique_similar.append(
+            (resource, f"Students who used '{accessed_by_key[sources[key]].title}' also used this")
+        )
+
+    # Then content-based similar resources for each accessed resource
     similar_resources = []
     for resource in accessed_resources[:3]:  # Limit to most recent 3 resources
         similar = get_similar_resources(resource, limit=3)
         similar_resources.extend(similar)
     
     # Remove duplicates and already accessed resources
-    seen_ids = set()
-    unique_similar = []
     for resource, explanation in similar_resources:
-        if resource.id not in seen_ids and resource not in accessed_resources:
-            seen_ids.add(resource.id)
+        key = (resource.resource_type, resource.id)
+        if key not in seen_keys:
+            seen_keys.add(key)
             unique_similar.append((resource, explanation))
     
     # If we don't have enough similar resources, add trending ones from user's faculty only
     if len(unique_similar) < limit and user_faculty:
-        trending = get_trending_resources(user_faculty, limit)
-        for resource, explanation in trending:
-            if resource.id not in seen_ids and resource not in accessed_resources:
-                seen_ids.add(resource.id)
+        for resource, explanation in faculty_trending():
+            key = (resource.resource_type, resource.id)
+            if key not in seen_keys:
+                seen_keys.add(key)
                 unique_similar.append((resource, explanation))
     
     return unique_similar[:limit]
@@ -449,18 +478,11 @@ def get_user_faculty(user):
     except UserProfile.DoesNotExist:
         pass
     
-    # Try to get faculty from recent activity
-    recent_views = ViewLog.objects.filter(user=user).order_by('-viewed_at')[:10]
-    for view in recent_views:
-        resource = get_resource_from_log(view)
-        if resource and resource.subject and resource.subject.faculty:
-            return resource.subject.faculty
-    
-    # Try to get faculty from recent downloads
-    recent_downloads = DownloadLog.objects.filter(user=user).order_by('-downloaded_at')[:10]
-    for download in recent_downloads:
-        resource = get_resource_from_log(download)
-        if resource and resource.subject and resource.subject.faculty:
+    # Try to get faculty from recent activity, then recent downloads
+    recent_views = list(ViewLog.objects.filter(user=user).order_by('-viewed_at').only('content_type', 'content_id')[:10])
+    recent_downloads = list(DownloadLog.objects.filter(user=user).order_by('-downloaded_at').only('content_type', 'content_id')[:10])
+    for resource in resolve_logged_resources(recent_views + recent_downloads):
+        if resource.subject and resource.subject.faculty:
             return resource.subject.faculty
     
     return None
@@ -486,6 +508,26 @@ def get_fallback_faculty():
     return faculty_counts.first()
 
 
+def resolve_logged_resources(log_entries):
+    """
+    Resolve ViewLog/DownloadLog entries into their resources in bulk.
+
+    Groups the entries by content_type and fetches each resource model with a
+    single id__in query (select_related subject and faculty), instead of one
+    query per log row.
+
+    Args:
+        log_entries: Iterable of ViewLog or DownloadLog instances
+
+    Returns:
+        List of approved resource instances in log order (entries whose
+        resource is missing, unapproved or not a resource are skipped)
+    """
+    return get_resources_by_keys(
+        (entry.content_type, entry.content_id) for entry in log_entries
+    )
+
+
 def get_resource_from_log(log_entry):
     """
     Get the actual resource instance from a ViewLog or DownloadLog entry.
@@ -494,31 +536,10 @@ def get_resource_from_log(log_entry):
         log_entry: ViewLog or DownloadLog instance
         
     Returns:
-        Resource instance (Syllabus, Note, or QuestionBank) or None
+        Resource instance (Syllabus, Note, QuestionBank, ...) or None
     """
-    try:
-        if hasattr(log_entry, 'content_type'):
-            content_type = log_entry.content_type
-            content_id = getattr(log_entry, 'content_id', None) or getattr(log_entry, 'object_id', None)
-            
-            if content_type == 'syllabus' and content_id:
-                return Syllabus.objects.get(id=content_id, status='approved')
-            elif content_type == 'note' and content_id:
-                return Note.objects.get(id=content_id, status='approved')
-            elif content_type == 'questionbank' and content_id:
-                return QuestionBank.objects.get(id=content_id, status='approved')
-            elif content_type == 'chapter' and content_id:
-                return Chapter.objects.get(id=content_id, status='approved')
-            elif content_type == 'viva' and content_id:
-                return Viva.objects.get(id=content_id, status='approved')
-            elif content_type == 'textbook' and content_id:
-                return TextBook.objects.get(id=content_id, status='approved')
-            elif content_type == 'practical' and content_id:
-                return Practical.objects.get(id=content_id, status='approved')
-    except Exception:
-        pass
-    
-    return None
+    resources = resolve_logged_resources([log_entry])
+    return resources[0] if resources else None
 
 
 def get_faculty_recommendations(faculty, limit=10):
@@ -576,7 +597,7 @@ def get_recommendations_for_faculty_slug(faculty_slug, limit=5):
         }
 
 
-def get_user_recommendations(user, limit=5):
+def get_user_recommendations(user, limit=5, user_faculty=None, shared=None):
     """
     Get comprehensive recommendations for a user including all three types.
     Provides fallback recommendations when user's faculty has no content.
@@ -584,6 +605,9 @@ def get_user_recommendations(user, limit=5):
     Args:
         user: User instance
         limit: Maximum number of recommendations per type
+        user_faculty: The user's faculty (looked up unless `shared` is given)
+        shared: get_faculty_recommendations() of `user_faculty`, if already
+            known (e.g. cached once for the whole faculty)
         
     Returns:
         Dictionary with 'trending', 'similar', and 'personalized' recommendations
@@ -595,13 +619,19 @@ def get_user_recommendations(user, limit=5):
             'personalized': []
         }
     
-    user_faculty = get_user_faculty(user)
+    if shared is None:
+        user_faculty = get_user_faculty(user)
     
     # Get trending recommendations from user's faculty only (strict filtering)
-    trending = get_trending_resources(user_faculty, limit) if user_faculty else []
+    if not user_faculty:
+        trending = []
+    elif shared is not None:
+        trending = shared['trending']
+    else:
+        trending = get_trending_resources(user_faculty, limit)
     
     # Get personalized recommendations (already has fallback built-in)
-    personalized = get_personalized_recommendations(user, limit)
+    personalized = get_personalized_recommendations(user, limit, user_faculty=user_faculty, trending=trending)
     
     # Get similar recommendations based on last viewed resource
     similar = []
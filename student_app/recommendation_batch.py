@@ -0,0 +1,167 @@
+"""
+Batch Recommendation Precomputation for Student Portal
+
+``python manage.py precompute_recommendations`` computes the similar and
+personalized lists of every recently active user across a pool of worker
+processes and stores them in UserRecommendation as compact
+[content_type, id, explanation] lists. Trending is shared by a faculty and
+only computed once per faculty (see recommendation_cache).
+
+When a user has no cached recommendations yet (typically the first page
+after login), recommendation_cache serves the stored lists instead of
+computing them: rendering only merges them with the faculty's shared
+segments and hydrates the remaining ids, with one query per resource type.
+The stored lists are then refreshed in the background like any stale cache
+entry.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils import timezone
+
+from .models import ViewLog, DownloadLog, UserRecommendation
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_KINDS = ('trending', 'similar', 'personalized')
+
+
+def active_user_ids(days=30):
+    """Ids of active users who logged in, viewed or downloaded in the last `days` days"""
+    since = timezone.now() - timedelta(days=days)
+    ids = set(User.objects.filter(is_active=True, last_login__gte=since).values_list('id', flat=True))
+    ids.update(ViewLog.objects.filter(viewed_at__gte=since, user__isnull=False).values_list('user_id', flat=True).distinct())
+    ids.update(DownloadLog.objects.filter(downloaded_at__gte=since).values_list('user_id', flat=True).distinct())
+    return sorted(User.objects.filter(id__in=ids, is_active=True).values_list('id', flat=True))
+
+
+def serialize_recommendations(recommendations, kinds=RECOMMENDATION_KINDS):
+    """Recommendation lists as JSON-friendly [content_type, id, explanation] items"""
+    return {
+        kind: [
+            [getattr(resource, 'resource_type', resource._meta.model_name), resource.id, explanation]
+            for resource, explanation in recommendations.get(kind, [])
+        ]
+        for kind in kinds
+    }
+
+
+def hydrate_recommendations(items, limit, known=()):
+    """
+    Resolve stored recommendation items back into resources
+
+    Resources that were deleted or are no longer approved are skipped.
+
+    Args:
+        items: Items from serialize_recommendations()
+        limit: Maximum number of recommendations per kind
+        known: Resources already loaded (with ``resource_type`` set), which
+            are not fetched again
+
+    Returns:
+        Dictionary with 'trending', 'similar', and 'personalized' recommendations
+        (kinds missing from `items` are empty)
+    """
+    from .recommend_utils import get_resources_by_keys
+
+    resources = {(resource.resource_type, resource.id): resource for resource in known}
+    keys = {(content_type, content_id) for kind in RECOMMENDATION_KINDS for content_type, content_id, _ in items.get(kind, [])}
+    missing = keys - resources.keys()
+    if missing:
+        resources.update(((resource.resource_type, resource.id), resource) for resource in get_resources_by_keys(missing))
+    return {
+        kind: [
+            (resources[(content_type, content_id)], explanation)
+            for content_type, content_id, explanation in items.get(kind, [])
+            if (content_type, content_id) in resources
+        ][:limit]
+        for kind in RECOMMENDATION_KINDS
+    }
+
+
+def load_precomputed_recommendations(user, limit=5):
+    """
+    Stored recommendations of a user, if recent enough and computed for `limit`
+
+    Returns:
+        UserRecommendation or None
+    """
+    max_age = timedelta(seconds=getattr(settings, 'RECOMMENDATION_PRECOMPUTE_MAX_AGE', 86400))
+    return UserRecommendation.objects.filter(
+        user_id=user.id, limit__gte=limit, computed_at__gte=timezone.now() - max_age
+    ).first()
+
+
+def _precompute_chunk(user_ids, limit):
+    """Compute and store the recommendations of `user_ids` (runs in a worker process)"""
+    from .recommendation_cache import compute_user_segments
+
+    rows, failed = [], 0
+    try:
+        for user in User.objects.filter(id__in=user_ids):
+            try:
+                _, faculty_id, items = compute_user_segments(user, limit)
+            except Exception as e:
+                failed += 1
+                logger.error(f"Recommendation precomputation failed for user {user.id}: {e}")
+                continue
+            rows.append(UserRecommendation(
+                user=user,
+                faculty_id=faculty_id,
+                items=items,
+                limit=limit,
+                computed_at=timezone.now(),
+            ))
+
+        UserRecommendation.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=['user'], update_fields=['faculty', 'items', 'limit', 'computed_at'],
+        )
+        return len(rows), failed
+    finally:
+        connections.close_all()
+
+
+def precompute_user_recommendations(user_ids, limit=None, workers=None, chunk_size=50):
+    """
+    Precompute and store the recommendations of `user_ids` in parallel
+
+    Users are split into chunks that are processed by a pool of forked
+    worker processes (or inline with a single worker).
+
+    Args:
+        user_ids: Ids of the users to precompute
+        limit: Recommendations per kind (defaults to RECOMMENDATION_PRECOMPUTE_LIMIT)
+        workers: Worker processes (defaults to the number of CPUs)
+        chunk_size: Users per task
+
+    Returns:
+        Tuple (stored, failed) with the number of users
+    """
+    limit = limit or getattr(settings, 'RECOMMENDATION_PRECOMPUTE_LIMIT', 6)
+    workers = workers or multiprocessing.cpu_count()
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    stored = failed = 0
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            chunk_stored, chunk_failed = _precompute_chunk(chunk, limit)
+            stored += chunk_stored
+            failed += chunk_failed
+        return stored, failed
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        futures = [pool.submit(_precompute_chunk, chunk, limit) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_stored, chunk_failed = future.result()
+            stored += chunk_stored
+            failed += chunk_failed
+    return stored, failed
@@ -0,0 +1,252 @@
+"""
+Recommendation Cache for Student Portal
+
+Stale-while-revalidate cache around get_user_recommendations:
+
+- a fresh entry is served as is;
+- a stale entry is still served immediately, and one background thread
+  recomputes it;
+- without an entry, one request computes while concurrent requests for the
+  same user wait for its result instead of computing it again, for at
+  most RECOMMENDATION_WAIT_TIMEOUT seconds; after that they get the
+  faculty's shared segments only.
+
+An entry goes stale after RECOMMENDATION_CACHE_SOFT_TTL seconds, or earlier
+once the user has been active since it was computed: views and downloads
+advance a per-user activity counter (record_user_activity), and the entry is
+recomputed when the counter has moved RECOMMENDATION_REFRESH_EVENTS past the
+value it was computed at, or RECOMMENDATION_REFRESH_INTERVAL seconds after
+the computation if there was any activity at all. Browsing therefore does
+not cost a recompute per click.
+
+Entries are split by what they depend on. Trending (and its global
+fallback) only depends on the faculty, so it is cached once per faculty and
+content version (get_shared_recommendations). A user's entry only keeps
+their own similar/personalized segments as compact [content_type, id,
+explanation] items; they are merged with the faculty's segments on read,
+hydrating only resources that are not in the shared segment.
+
+Users without an entry get the lists stored offline by
+``python manage.py precompute_recommendations`` if there are any (see
+recommendation_batch); they are served and refreshed like a stale entry.
+
+Single-flight is enforced with a per-user lock key taken with cache.add(),
+which is atomic in Django's cache backends. Locks, activity counters and
+entries are only shared between processes that share the cache (REDIS_URL);
+with the per-process LocMemCache each worker computes and refreshes its own
+entries.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache_utils import versioned_key
+from .recommendation_batch import hydrate_recommendations, load_precomputed_recommendations, serialize_recommendations
+
+logger = logging.getLogger(__name__)
+
+# Segments cached per user; 'trending' is shared by the user's faculty
+USER_SEGMENTS = ('similar', 'personalized')
+
+LOCK_TIMEOUT = 60  # seconds; a crashed computation cannot block a user longer
+WAIT_INTERVAL = 0.05
+
+
+def cache_key(user_id):
+    return f"user_recommendations_{user_id}"
+
+
+def _activity_key(user_id):
+    return f"user_activity_{user_id}"
+
+
+def _lock_key(user_id, limit):
+    return f"user_recommendations_lock_{user_id}_{limit}"
+
+
+def _shared_key(faculty_id, limit):
+    return versioned_key(f"faculty_recommendations_{faculty_id}_{limit}")
+
+
+def _soft_ttl():
+    return getattr(settings, 'RECOMMENDATION_CACHE_SOFT_TTL', 300)
+
+
+def get_user_activity(user_id):
+    """Number of recorded activity events of a user (0 if unknown)"""
+    return cache.get(_activity_key(user_id), 0)
+
+
+def record_user_activity(user_id):
+    """Count a view/download of a user towards refreshing their recommendations"""
+    try:
+        cache.incr(_activity_key(user_id))
+    except ValueError:
+        if not cache.add(_activity_key(user_id), 1, timeout=None):
+            cache.incr(_activity_key(user_id))
+
+
+def _is_stale(entry, activity, now):
+    if entry['fresh_until'] < now:
+        return True
+    events = activity - entry['activity']
+    if events <= 0:
+        return False
+    return (
+        events >= getattr(settings, 'RECOMMENDATION_REFRESH_EVENTS', 5)
+        or now - entry['computed_at'] >= getattr(settings, 'RECOMMENDATION_REFRESH_INTERVAL', 60)
+    )
+
+
+def get_shared_recommendations(faculty_id, limit=5):
+    """
+    Recommendation segments shared by every student of a faculty
+
+    Cached once per faculty for RECOMMENDATION_SHARED_CACHE_TIMEOUT seconds;
+    content changes invalidate them through the content version.
+
+    Args:
+        faculty_id: Id of the faculty (None for users without one)
+        limit: Maximum number of recommendations per type
+
+    Returns:
+        Dictionary with 'trending' recommendations (global trending if the
+        faculty has none, empty without a faculty)
+    """
+    if faculty_id is None:
+        return {'trending': []}
+
+    key = _shared_key(faculty_id, limit)
+    shared = cache.get(key)
+    if shared is None:
+        from .models import Faculty
+        from .recommend_utils import get_faculty_recommendations
+
+        faculty = Faculty.objects.filter(pk=faculty_id).first()
+        shared = {'trending': get_faculty_recommendations(faculty, limit)['trending']}
+        cache.set(key, shared, getattr(settings, 'RECOMMENDATION_SHARED_CACHE_TIMEOUT', 300))
+    return shared
+
+
+def compute_user_segments(user, limit=5):
+    """
+    Compute the recommendations of a user on top of their faculty's shared segments
+
+    Returns:
+        Tuple (recommendations, faculty_id, items): the full recommendations,
+        the user's faculty id and their own segments as compact items
+    """
+    from .recommend_utils import get_user_faculty, get_user_recommendations
+
+    faculty = get_user_faculty(user)
+    faculty_id = faculty.id if faculty else None
+    recommendations = get_user_recommendations(
+        user, limit=limit, user_faculty=faculty, shared=get_shared_recommendations(faculty_id, limit)
+    )
+    return recommendations, faculty_id, serialize_recommendations(recommendations, USER_SEGMENTS)
+
+
+def _render(entry, limit):
+    """Merge a user's entry with the shared segments of their faculty"""
+    shared = get_shared_recommendations(entry['faculty_id'], limit)
+    recommendations = hydrate_recommendations(
+        entry['items'], limit, known=[resource for resource, _ in shared['trending']]
+    )
+    recommendations['trending'] = shared['trending'][:limit]
+    return recommendations
+
+
+def _compute_and_store(user, limit):
+    """Compute recommendations, store them and release the user's lock"""
+    try:
+        # Read before computing, so activity during the computation still counts
+        activity = get_user_activity(user.id)
+        recommendations, faculty_id, items = compute_user_segments(user, limit)
+        _store_entry(user.id, limit, faculty_id, items, activity, time.time())
+        return recommendations
+    finally:
+        cache.delete(_lock_key(user.id, limit))
+
+
+def _store_entry(user_id, limit, faculty_id, items, activity, computed_at):
+    entry = {
+        'faculty_id': faculty_id,
+        'items': items,
+        'activity': activity,
+        'computed_at': computed_at,
+        'fresh_until': computed_at + _soft_ttl(),
+    }
+    entries = cache.get(cache_key(user_id)) or {}
+    entries[limit] = entry
+    cache.set(cache_key(user_id), entries, getattr(settings, 'RECOMMENDATION_CACHE_TIMEOUT', 3600))
+    return entry
+
+
+def _refresh_in_background(user, limit):
+    def run():
+        try:
+            _compute_and_store(user, limit)
+        except Exception as e:
+            logger.error(f"Recommendation refresh failed for user {user.id}: {e}")
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'recommendations-{user.id}', daemon=True).start()
+
+
+def get_cached_recommendations(user, limit=5):
+    """
+    Recommendations of a user, served from the stale-while-revalidate cache
+
+    Args:
+        user: Authenticated user
+        limit: Maximum number of recommendations per type
+
+    Returns:
+        Dictionary with 'trending', 'similar', and 'personalized' recommendations
+    """
+    entry = (cache.get(cache_key(user.id)) or {}).get(limit)
+    if entry is None:
+        # Lists stored by precompute_recommendations only need hydrating
+        stored = load_precomputed_recommendations(user, limit)
+        if stored is not None:
+            entry = _store_entry(
+                user.id, limit, stored.faculty_id, stored.items,
+                get_user_activity(user.id), stored.computed_at.timestamp(),
+            )
+    if entry is not None:
+        stale = _is_stale(entry, get_user_activity(user.id), time.time())
+        if stale and cache.add(_lock_key(user.id, limit), True, LOCK_TIMEOUT):
+            _refresh_in_background(user, limit)
+        return _render(entry, limit)
+
+    if cache.add(_lock_key(user.id, limit), True, LOCK_TIMEOUT):
+        return _compute_and_store(user, limit)
+
+    # Another request is computing them: wait briefly for its result
+    deadline = time.monotonic() + getattr(settings, 'RECOMMENDATION_WAIT_TIMEOUT', 2)
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = (cache.get(cache_key(user.id)) or {}).get(limit)
+        if entry is not None:
+            return _render(entry, limit)
+        if cache.get(_lock_key(user.id, limit)) is None:
+            # The other computation failed or the entry was invalidated meanwhile
+            from .recommend_utils import get_user_recommendations
+            return get_user_recommendations(user, limit=limit)
+
+    # Still computing: do not hold this worker, serve the faculty's segments
+    from .recommend_utils import get_user_faculty
+    faculty = get_user_faculty(user)
+    shared = get_shared_recommendations(faculty.id if faculty else None, limit)
+    return {'trending': shared['trending'][:limit], 'similar': [], 'personalized': []}
+
+
+def invalidate_user_recommendations(user_id):
+    """Drop a user's cached recommendations (all limits)"""
+    cache.delete(cache_key(user_id))
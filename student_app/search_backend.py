@@ -0,0 +1,381 @@
+"""
+Search Backend for Student Portal
+
+Runs the catalogue search of views.search inside the database. The matching
+rows of all searchable tables are combined with UNION ALL as lightweight
+(kind, id, rank, sort_name) tuples, so ordering and LIMIT/OFFSET happen in
+SQL; only the rows of the requested page are then loaded as model instances.
+Facet counts (per type, faculty and level) come from a second UNION ALL of
+one grouped COUNT per table.
+
+Ranked results can be cached as (kind, id) lists under the content version
+(cached_search_results), so a repeated query costs one cache hit plus one
+batched fetch of the requested page.
+
+Text matching is pluggable: on PostgreSQL, resources are matched against
+their weighted `search_vector` column (title A, body B, extracted file text
+C; GIN indexed) and
+ranked with ts_rank_cd. Subjects have no stored vector: they are matched
+with icontains and ranked with ts_rank_cd over their name (A) and
+description (B), plus a boost when the name equals or starts with the query.
+Other databases fall back to icontains lookups over the same fields.
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, CharField, Count, F, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Lower
+
+from .cache_utils import versioned_key
+from .models import (
+    Subject, Syllabus, QuestionBank, Chapter, Viva, TextBook, Practical,
+    ResourceText, RESOURCE_MODELS, SEARCH_BODY_FIELDS
+)
+
+# Text search configuration used for both the stored vectors and queries
+SEARCH_CONFIG = 'english'
+
+# Added to a subject's rank when its name equals / starts with the query, so
+# a subject named like the query ranks with the best matching resources
+SUBJECT_EXACT_NAME_BOOST = 1.0
+SUBJECT_PREFIX_NAME_BOOST = 0.5
+
+# kind -> (model, name field) of the kinds listed by views.search
+SEARCH_KINDS = OrderedDict([
+    ('subject', (Subject, 'name')),
+    ('syllabus', (Syllabus, 'title')),
+    ('questionbank', (QuestionBank, 'title')),
+    ('chapter', (Chapter, 'title')),
+    ('viva', (Viva, 'title')),
+    ('textbook', (TextBook, 'title')),
+    ('practical', (Practical, 'title')),
+])
+
+
+def full_text_enabled(kind=None):
+    """Whether `kind` (or resources in general) is matched with PostgreSQL full-text search"""
+    return (
+        connection.vendor == 'postgresql'
+        and getattr(settings, 'SEARCH_FULL_TEXT', True)
+        and (kind is None or kind in RESOURCE_MODELS)
+    )
+
+
+def search_vector(content_type):
+    """Weighted tsvector expression of a resource type: title A, body B, file text C"""
+    extracted = ResourceText.objects.filter(content_type=content_type, content_id=OuterRef('pk'))
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(*SEARCH_BODY_FIELDS[content_type], weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(extracted.values('text')[:1]), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(resource):
+    """Recompute the stored search_vector of a saved resource (PostgreSQL only)"""
+    if not full_text_enabled():
+        return
+    content_type = resource._meta.model_name
+    type(resource).objects.filter(pk=resource.pk).update(search_vector=search_vector(content_type))
+
+
+def text_fields(kind):
+    """Fields matched by the icontains fallback"""
+    if kind == 'subject':
+        return ['name', 'description']
+    return ['title'] + SEARCH_BODY_FIELDS[kind]
+
+
+def text_filter(kind, query):
+    """Q object matching `query` against the text fields of a kind"""
+    condition = Q()
+    for field in text_fields(kind):
+        condition |= Q(**{f'{field}__icontains': query})
+    return condition
+
+
+def _prefix_query(query):
+    """tsquery source matching every word of `query` as a prefix"""
+    terms = re.findall(r'\w+', query.lower())
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def match_text(queryset, kind, query):
+    """
+    Filter a queryset of `kind` to rows matching `query`, annotated with `rank`
+
+    Args:
+        queryset: Queryset of the kind's model
+        kind: Subject or resource type key
+        query: User's search text
+
+    Returns:
+        Filtered queryset; `rank` is ts_rank_cd with full-text search and 0
+        otherwise
+    """
+    tsquery = _prefix_query(query)
+    if full_text_enabled(kind) and tsquery:
+        search_query = SearchQuery(tsquery, search_type='raw', config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query, cover_density=True)
+        )
+    if kind == 'subject' and full_text_enabled() and tsquery:
+        search_query = SearchQuery(tsquery, search_type='raw', config=SEARCH_CONFIG)
+        vector = (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        )
+        return queryset.filter(text_filter(kind, query)).annotate(
+            rank=SearchRank(vector, search_query, cover_density=True) + _subject_name_boost(query)
+        )
+    return queryset.filter(text_filter(kind, query)).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def _subject_name_boost(query):
+    """Rank boost of subjects whose name equals or starts with `query`"""
+    query = query.strip()
+    return Case(
+        When(name__iexact=query, then=Value(SUBJECT_EXACT_NAME_BOOST)),
+        When(name__istartswith=query, then=Value(SUBJECT_PREFIX_NAME_BOOST)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def search_querysets(query='', faculty_id=None, subject_id=None, level=None, resource_type=None):
+    """
+    Filtered querysets of every searched kind
+
+    Args:
+        query: Text to match (no text filtering if empty)
+        faculty_id: Restrict to a faculty
+        subject_id: Restrict to a subject
+        level: Restrict to a semester/year
+        resource_type: Search only this kind
+
+    Returns:
+        OrderedDict of kind -> queryset
+    """
+    querysets = OrderedDict()
+    for kind, (model, _) in SEARCH_KINDS.items():
+        if resource_type and resource_type != kind:
+            continue
+
+        if kind == 'subject':
+            qs = model.objects.filter(is_active=True)
+            prefix = ''
+        else:
+            qs = model.objects.filter(status='approved')
+            prefix = 'subject__'
+
+        if query:
+            qs = match_text(qs, kind, query)
+        if faculty_id:
+            qs = qs.filter(**{f'{prefix}faculty_id': faculty_id})
+        if subject_id:
+            qs = qs.filter(id=subject_id) if kind == 'subject' else qs.filter(subject_id=subject_id)
+        if level:
+            qs = qs.filter(**{f'{prefix}level': level})
+        querysets[kind] = qs
+    return querysets
+
+
+class SearchFacets:
+    """
+    Result counts per type, faculty and level
+
+    Built from (kind, faculty_id, level, count) rows, i.e. the matches
+    grouped by all three at once.
+    """
+
+    def __init__(self, rows, kinds=()):
+        self.rows = [tuple(row) for row in rows]
+        self.types = {kind: 0 for kind in kinds}
+        self.faculties = {}
+        self.levels = {}
+        for kind, faculty_id, level, matches in self.rows:
+            self.types[kind] = self.types.get(kind, 0) + matches
+            self.faculties[faculty_id] = self.faculties.get(faculty_id, 0) + matches
+            self.levels[level] = self.levels.get(level, 0) + matches
+
+    @classmethod
+    def from_instances(cls, results):
+        """Facets of already loaded subjects/resources"""
+        grouped = Counter()
+        for obj in results:
+            subject = obj if isinstance(obj, Subject) else obj.subject
+            grouped[(result_key(obj)[0], subject.faculty_id, subject.level)] += 1
+        return cls([(*group, matches) for group, matches in grouped.items()])
+
+    @property
+    def total(self):
+        return sum(self.types.values())
+
+
+class UnionSearchResults:
+    """
+    Union of several querysets ordered by rank and name, sliceable by Paginator
+
+    Slicing runs one UNION ALL query for the page's (kind, id) pairs and one
+    query per kind present on the page to load the instances.
+    """
+
+    def __init__(self, querysets):
+        self.querysets = querysets
+        self._facets = None
+
+    def facets(self):
+        """Match counts per type, faculty and level from a single grouped UNION ALL"""
+        if self._facets is None:
+            parts = []
+            for kind, qs in self.querysets.items():
+                prefix = '' if kind == 'subject' else 'subject__'
+                parts.append(
+                    qs.order_by().annotate(
+                        kind=Value(kind, output_field=CharField()),
+                        facet_faculty=F(f'{prefix}faculty_id'),
+                        facet_level=F(f'{prefix}level'),
+                    ).values('kind', 'facet_faculty', 'facet_level')
+                    .annotate(matches=Count('id'))
+                    .values_list('kind', 'facet_faculty', 'facet_level', 'matches')
+                )
+            self._facets = SearchFacets(_union(parts) if parts else [], self.querysets)
+        return self._facets
+
+    def counts(self):
+        """Number of matches per kind"""
+        return self.facets().types
+
+    def count(self):
+        return self.facets().total
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return hydrate([(kind, pk) for kind, pk, _, _ in self.rows(key)])
+
+    def rows(self, key=slice(None)):
+        """(kind, id, rank, sort_name) rows of a slice, in result order"""
+        if key.start is not None and key.start == key.stop:
+            return []
+        parts = []
+        for kind, qs in self.querysets.items():
+            if 'rank' not in qs.query.annotations:
+                qs = qs.annotate(rank=Value(0.0, output_field=FloatField()))
+            parts.append(qs.order_by().annotate(
+                kind=Value(kind, output_field=CharField()),
+                sort_name=Lower(SEARCH_KINDS[kind][1]),
+            ).values_list('kind', 'id', 'rank', 'sort_name'))
+        if not parts:
+            return []
+        return list(_union(parts).order_by('-rank', 'sort_name', 'kind', 'id')[key])
+
+
+class CachedSearchResults:
+    """Ranked (kind, id) pairs; slicing loads only the instances of the slice"""
+
+    def __init__(self, keys, facets):
+        self.keys = keys
+        self._facets = facets
+
+    def facets(self):
+        return self._facets
+
+    def counts(self):
+        return self._facets.types
+
+    def count(self):
+        return len(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return hydrate(self.keys[key])
+
+
+def hydrate(keys):
+    """
+    Load the instances of (kind, id) pairs, keeping their order
+
+    Runs one query per kind present; rows deleted in the meantime are left out.
+    """
+    ids_by_kind = OrderedDict()
+    for kind, pk in keys:
+        ids_by_kind.setdefault(kind, []).append(pk)
+
+    instances = {}
+    for kind, ids in ids_by_kind.items():
+        if kind == 'subject':
+            queryset = Subject.objects.select_related('faculty')
+        else:
+            queryset = RESOURCE_MODELS[kind].objects.select_related('subject__faculty')
+        for obj in queryset.filter(id__in=ids).order_by():
+            instances[(kind, obj.id)] = obj
+    return [instances[(kind, pk)] for kind, pk in keys if (kind, pk) in instances]
+
+
+def normalize_query(query):
+    """Lowercased query with collapsed whitespace, as used for matching and cache keys"""
+    return ' '.join((query or '').lower().split())
+
+
+def result_key(obj):
+    """(kind, id) pair identifying a subject or resource"""
+    return ('subject' if isinstance(obj, Subject) else obj._meta.model_name, obj.pk)
+
+
+def cached_search_results(name, params, compute):
+    """
+    Ranked search results, cached as (kind, id) lists under the content version
+
+    Args:
+        name: Search flavour ('search', 'advanced', ...) used in the cache key
+        params: Normalized query and filters (JSON-serializable)
+        compute: Callable returning the ranked results, either a
+            UnionSearchResults or a list of instances
+
+    Returns:
+        Sliceable results with len() (and facets() unless a plain list was
+        computed); result sets larger than SEARCH_CACHE_MAX_RESULTS are
+        returned uncached
+    """
+    digest = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    key = versioned_key(f'search_results:{name}:{digest}')
+    cached = cache.get(key)
+    if cached is not None:
+        return CachedSearchResults(cached['keys'], SearchFacets(cached['facets']))
+
+    max_results = getattr(settings, 'SEARCH_CACHE_MAX_RESULTS', 1000)
+    results = compute()
+    if isinstance(results, UnionSearchResults):
+        rows = results.rows(slice(0, max_results + 1))
+        if len(rows) > max_results:
+            return results
+        keys = [(kind, pk) for kind, pk, _, _ in rows]
+        facets = results.facets()
+        results = CachedSearchResults(keys, facets)
+    else:
+        if len(results) > max_results:
+            return results
+        keys = [result_key(obj) for obj in results]
+        facets = SearchFacets.from_instances(results)
+    cache.set(key, {'keys': keys, 'facets': facets.rows}, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+    return results
+
+
+def _union(parts):
+    first, rest = parts[0], parts[1:]
+    return first.union(*rest, all=True) if rest else first
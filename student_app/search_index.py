@@ -0,0 +1,424 @@
+"""
+Persistent Search Index for Django Student Portal
+=================================================
+
+This module keeps a prebuilt TF-IDF index over every approved resource
+(Note, Syllabus, QuestionBank, Chapter, Viva, TextBook and Practical) so that
+a search only has to transform the query and take one sparse dot product,
+instead of refitting a vectorizer over the whole catalogue per request.
+
+The index stores:
+1. The fitted vocabulary (CountVectorizer)
+2. The IDF vector (TfidfTransformer)
+3. The raw term-count matrix and the L2-normalized TF-IDF document matrix
+4. The (content_type, id) key of every row
+
+It is built by ``python manage.py build_search_index`` and loaded once per
+worker by ``get_search_index()``. Afterwards, resource save/delete signals
+queue incremental updates (``schedule_index_update``) that append, replace
+or tombstone rows and refresh IDF statistics in a background thread.
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+from .models import ResourceText, RESOURCE_MODELS
+from .search_utils import search_engine
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+ResourceKey = Tuple[str, int]
+
+
+def get_index_path() -> str:
+    """Location of the persisted index file"""
+    return getattr(
+        settings,
+        'SEARCH_INDEX_PATH',
+        os.path.join(settings.BASE_DIR, 'search_index', 'tfidf_index.joblib')
+    )
+
+
+def resource_key(resource) -> ResourceKey:
+    """Index key for a resource instance: (content_type, id)"""
+    return resource._meta.model_name, resource.pk
+
+
+class SearchIndex:
+    """
+    Fitted TF-IDF index over the approved resource catalogue
+
+    Rows of ``matrix`` are L2-normalized, so the dot product with a transformed
+    query is the cosine similarity used by EnhancedSearchEngine.
+    """
+
+    def __init__(self, count_vectorizer, transformer, counts, keys: List[ResourceKey]):
+        self.count_vectorizer = count_vectorizer
+        self.transformer = transformer
+        self.counts = counts.tocsr()
+        self.keys = list(keys)
+        self.positions = {key: row for row, key in enumerate(self.keys)}
+        self.matrix = self.transformer.transform(self.counts)
+
+    @classmethod
+    def build(cls) -> 'SearchIndex':
+        """
+        Build a fresh index from the database
+
+        Returns:
+            SearchIndex: Index covering every approved resource
+
+        Raises:
+            ValueError: If there are no approved resources to index
+        """
+        keys, texts = [], []
+        for resource in iter_indexable_resources():
+            keys.append(resource_key(resource))
+            texts.append(document_text(resource))
+
+        if not texts:
+            raise ValueError("No approved resources to index")
+
+        count_vectorizer = CountVectorizer(
+            max_features=getattr(settings, 'SEARCH_INDEX_MAX_FEATURES', 50000),
+            stop_words='english',
+            ngram_range=(1, 2),  # Same n-grams as EnhancedSearchEngine
+            lowercase=True,
+            strip_accents='unicode'
+        )
+        counts = count_vectorizer.fit_transform(texts)
+        transformer = TfidfTransformer(norm='l2', smooth_idf=True).fit(counts)
+
+        return cls(count_vectorizer, transformer, counts, keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def transform(self, processed_texts: Iterable[str]):
+        """Vectorize already preprocessed texts with the fitted vocabulary and IDF"""
+        return self.transformer.transform(self.count_vectorizer.transform(list(processed_texts)))
+
+    def score_documents(self, query: str, documents: List[Any]) -> np.ndarray:
+        """
+        Cosine similarity between a query and each of the given documents
+
+        Documents that are not in the index yet are vectorized with the fitted
+        vocabulary on the fly (no refit).
+
+        Args:
+            query (str): Raw search query
+            documents (List[Any]): Resource instances
+
+        Returns:
+            np.ndarray: One score per document, in input order
+        """
+        query_vector = self.transform([search_engine.preprocess_text(query)])
+        scores = np.zeros(len(documents))
+        if not documents or query_vector.nnz == 0:
+            return scores
+
+        indexed, missing = [], []
+        for i, doc in enumerate(documents):
+            row = self.positions.get(resource_key(doc))
+            if row is None:
+                missing.append(i)
+            else:
+                indexed.append((i, row))
+
+        if indexed:
+            order, rows = zip(*indexed)
+            doc_scores = self.matrix[list(rows)] @ query_vector.T
+            scores[list(order)] = doc_scores.toarray().ravel()
+
+        if missing:
+            extra = self.transform(document_text(documents[i]) for i in missing)
+            scores[missing] = (extra @ query_vector.T).toarray().ravel()
+
+        return scores
+
+    def with_updates(self, upserts: Dict[ResourceKey, str], removals: Iterable[ResourceKey]) -> 'SearchIndex':
+        """
+        Return a copy of the index with rows updated and IDF refreshed
+
+        Replaced and removed rows are tombstoned and dropped, new/replaced
+        documents are appended using the fitted vocabulary (terms outside it
+        are picked up by the next full rebuild), then IDF is recomputed from
+        the stored term counts. The current index is left untouched so that
+        concurrent searches keep a consistent view.
+
+        Args:
+            upserts (Dict[ResourceKey, str]): Preprocessed text per key to add or replace
+            removals (Iterable[ResourceKey]): Keys to drop from the index
+
+        Returns:
+            SearchIndex: The updated index
+        """
+        tombstoned = {self.positions[key] for key in list(upserts) + list(removals) if key in self.positions}
+        live_rows = [row for row in range(len(self.keys)) if row not in tombstoned]
+
+        counts = self.counts[live_rows]
+        keys = [self.keys[row] for row in live_rows]
+        if upserts:
+            counts = sparse.vstack([counts, self.count_vectorizer.transform(list(upserts.values()))], format='csr')
+            keys.extend(upserts)
+
+        # Refresh IDF with the same smoothing TfidfTransformer uses
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        transformer = copy.deepcopy(self.transformer)
+        transformer.idf_ = np.log((1 + counts.shape[0]) / (1 + document_frequency)) + 1
+
+        return SearchIndex(self.count_vectorizer, transformer, counts, keys)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Persist the index atomically and return the file path"""
+        path = path or get_index_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({
+            'version': INDEX_FORMAT_VERSION,
+            'count_vectorizer': self.count_vectorizer,
+            'transformer': self.transformer,
+            'counts': self.counts,
+            'keys': self.keys,
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional['SearchIndex']:
+        """Load a persisted index, or None if it is missing or outdated"""
+        path = path or get_index_path()
+        if not os.path.exists(path):
+            return None
+        payload = joblib.load(path)
+        if payload.get('version') != INDEX_FORMAT_VERSION:
+            logger.warning(f"Ignoring search index at {path}: unsupported format version")
+            return None
+        return cls(payload['count_vectorizer'], payload['transformer'], payload['counts'], payload['keys'])
+
+
+def with_extracted_text(queryset, content_type: str):
+    """Annotate resources with the text extracted from their files (see text_extraction)"""
+    extracted = ResourceText.objects.filter(content_type=content_type, content_id=OuterRef('pk'))
+    return queryset.annotate(
+        extracted_text=Subquery(extracted.values('text')[:1]),
+        extracted_at=Subquery(extracted.values('extracted_at')[:1]),
+    )
+
+
+def iter_indexable_resources():
+    """Yield every approved resource that belongs in the search index"""
+    for content_type, model in RESOURCE_MODELS.items():
+        queryset = model.objects.filter(status='approved').select_related('subject__faculty')
+        yield from with_extracted_text(queryset, content_type).iterator()
+
+
+def document_text(resource) -> str:
+    """Preprocessed searchable text of a resource, including extracted file text"""
+    text = search_engine.extract_document_text(resource)
+    extracted = getattr(resource, 'extracted_text', None)
+    if extracted:
+        text = f"{text} {extracted}"
+    # Re-extraction does not touch the resource's updated_at
+    return search_engine.preprocess_document(resource, text, 'index', getattr(resource, 'extracted_at', None))
+
+
+# Per-worker index, loaded lazily on first use and reloaded when another
+# worker (or the build command) writes a newer file
+_index: Optional[SearchIndex] = None
+_index_mtime: Optional[float] = None
+_index_checked_at = 0.0
+_index_lock = threading.Lock()
+
+# Resource keys waiting to be applied to the index by the background flusher
+_pending_keys: Set[ResourceKey] = set()
+_pending_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+
+def _index_file_mtime() -> Optional[float]:
+    try:
+        return os.stat(get_index_path()).st_mtime
+    except OSError:
+        return None
+
+
+@contextmanager
+def _index_file_lock():
+    """Serialize index writes across worker processes (no-op without fcntl)"""
+    if fcntl is None:
+        yield
+        return
+    lock_path = f"{get_index_path()}.lock"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _activate(index: Optional[SearchIndex], mtime: Optional[float]) -> None:
+    global _index, _index_mtime, _index_checked_at
+    with _index_lock:
+        _index = index
+        _index_mtime = mtime
+        _index_checked_at = time.monotonic()
+
+
+def _load_if_changed() -> Optional[SearchIndex]:
+    """Reload the index from disk if the file is newer than the loaded copy"""
+    mtime = _index_file_mtime()
+    if mtime is not None and mtime != _index_mtime:
+        try:
+            _activate(SearchIndex.load(), mtime)
+        except Exception as e:
+            logger.error(f"Failed to load search index: {e}")
+            _activate(_index, mtime)
+    return _index
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """
+    Get the worker's search index, loading it from disk on first use
+
+    The file's modification time is re-checked at most every
+    SEARCH_INDEX_RELOAD_INTERVAL seconds so that updates written by other
+    workers become visible without a restart.
+
+    Returns:
+        Optional[SearchIndex]: The index, or None if it has not been built yet
+    """
+    global _index_checked_at
+    interval = getattr(settings, 'SEARCH_INDEX_RELOAD_INTERVAL', 5)
+    if time.monotonic() - _index_checked_at >= interval:
+        _index_checked_at = time.monotonic()
+        _load_if_changed()
+    return _index
+
+
+def activate_search_index(index: Optional[SearchIndex]) -> None:
+    """Serve `index` in this worker until the file on disk changes (benchmarks)"""
+    _activate(index, _index_file_mtime())
+
+
+def rebuild_search_index() -> SearchIndex:
+    """Rebuild, persist and activate a fresh index in this worker"""
+    index = SearchIndex.build()
+    with _index_file_lock():
+        index.save()
+        _activate(index, _index_file_mtime())
+    return index
+
+
+def schedule_index_update(content_type: str, resource_id: int) -> None:
+    """
+    Queue a resource for re-indexing after it was saved or deleted
+
+    The resource is only queued once the surrounding transaction commits
+    (immediately in autocommit mode), so rolled back changes never reach the
+    index and a flush never reads uncommitted rows. Updates are then
+    debounced for SEARCH_INDEX_UPDATE_DELAY seconds and applied in a
+    background thread, so request handlers never pay for re-vectorizing.
+
+    Args:
+        content_type (str): Resource type key (see RESOURCE_MODELS)
+        resource_id (int): Primary key of the resource
+    """
+    transaction.on_commit(lambda: _queue_index_update(content_type, resource_id))
+
+
+def _queue_index_update(content_type: str, resource_id: int) -> None:
+    global _flush_timer
+    with _pending_lock:
+        _pending_keys.add((content_type, resource_id))
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(
+                getattr(settings, 'SEARCH_INDEX_UPDATE_DELAY', 2.0),
+                _flush_in_background
+            )
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+
+def _flush_in_background() -> None:
+    try:
+        flush_index_updates()
+    except Exception as e:
+        logger.error(f"Search index update failed: {e}")
+    finally:
+        # The timer thread opened its own connection
+        connections.close_all()
+
+
+def flush_index_updates() -> int:
+    """
+    Apply queued resource changes to the index and persist it
+
+    Approved resources are appended or replaced, anything else (rejected,
+    pending or deleted) is tombstoned, and IDF statistics are refreshed.
+
+    Returns:
+        int: Number of resources processed
+    """
+    global _flush_timer
+    with _pending_lock:
+        keys = set(_pending_keys)
+        _pending_keys.clear()
+        _flush_timer = None
+    if not keys:
+        return 0
+
+    with _index_file_lock():
+        index = _load_if_changed()
+        if index is None:
+            # Nothing to maintain until the first full build
+            return 0
+
+        ids_by_type = defaultdict(set)
+        for content_type, resource_id in keys:
+            ids_by_type[content_type].add(resource_id)
+
+        upserts, removals = {}, []
+        for content_type, ids in ids_by_type.items():
+            model = RESOURCE_MODELS[content_type]
+            approved = {
+                resource.pk: resource
+                for resource in with_extracted_text(
+                    model.objects.filter(pk__in=ids, status='approved').select_related('subject__faculty'),
+                    content_type
+                )
+            }
+            for resource_id in ids:
+                if resource_id in approved:
+                    upserts[(content_type, resource_id)] = document_text(approved[resource_id])
+                else:
+                    removals.append((content_type, resource_id))
+
+        index = index.with_updates(upserts, removals)
+        index.save()
+        _activate(index, _index_file_mtime())
+
+    return len(keys)
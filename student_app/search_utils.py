@@ -14,27 +14,27 @@ Author: Student Portal Development Team
 Purpose: Final Year Project - Enhanced Search System
 """
 
+import logging
 import re
 import math
-import numpy as np
-from collections import Counter, defaultdict
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
 from typing import List, Dict, Tuple, Any
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
 
-# Download required NLTK data (only once)
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
+from .stopwords import STOP_WORDS
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+logger = logging.getLogger(__name__)
+
+# scikit-learn, NumPy and NLTK take seconds to import, so they are imported
+# on first use instead of when a worker loads the URLconf
+
+# Distinct words whose stems are kept (vocabularies are small; stemming is the
+# most expensive preprocessing step)
+STEM_CACHE_SIZE = 50_000
+
+# Preprocessed texts of this many resources are kept between searches
+DOCUMENT_CACHE_SIZE = 5_000
 
 class EnhancedSearchEngine:
     """
@@ -49,18 +49,41 @@ class EnhancedSearchEngine:
     
     def __init__(self):
         """Initialize the search engine with preprocessing tools"""
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,  # Limit vocabulary size for performance
-            stop_words='english',
-            ngram_range=(1, 2),  # Include both unigrams and bigrams
-            min_df=1,  # Minimum document frequency
-            max_df=0.95,  # Maximum document frequency (ignore very common words)
-            lowercase=True,
-            strip_accents='unicode'
-        )
-        self.stemmer = PorterStemmer()
-        self.stop_words = set(stopwords.words('english'))
-        
+        self._vectorizer = None
+        self._stemmer = None
+        self.stop_words = STOP_WORDS
+        self.stem = lru_cache(maxsize=STEM_CACHE_SIZE)(self._stem)
+        # (model, id, variant) -> ((updated_at, version), preprocessed text), least recently used first
+        self._documents = OrderedDict()
+        self._documents_lock = threading.Lock()
+        
+    @property
+    def vectorizer(self):
+        """TF-IDF vectorizer for ad-hoc scoring (created on first use)"""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self._vectorizer = TfidfVectorizer(
+                max_features=1000,  # Limit vocabulary size for performance
+                stop_words='english',
+                ngram_range=(1, 2),  # Include both unigrams and bigrams
+                min_df=1,  # Minimum document frequency
+                max_df=0.95,  # Maximum document frequency (ignore very common words)
+                lowercase=True,
+                strip_accents='unicode'
+            )
+        return self._vectorizer
+    
+    @property
+    def stemmer(self):
+        """Porter stemmer (NLTK is imported on first use)"""
+        if self._stemmer is None:
+            from nltk.stem.porter import PorterStemmer
+            self._stemmer = PorterStemmer()
+        return self._stemmer
+    
+    def _stem(self, word: str) -> str:
+        return self.stemmer.stem(word)
+    
     def preprocess_text(self, text: str) -> str:
         """
         Preprocess text for better search results
@@ -94,10 +117,57 @@ class EnhancedSearchEngine:
         words = [word for word in words if word not in self.stop_words and len(word) > 2]
         
         # Apply stemming
-        words = [self.stemmer.stem(word) for word in words]
+        words = [self.stem(word) for word in words]
         
         return ' '.join(words)
     
+    def preprocess_document(self, resource, text: str, variant: str = '', version: Any = None) -> str:
+        """
+        Preprocessed text of a resource, cached until the resource changes
+        
+        Entries are keyed by model and id and only reused while the
+        resource's `updated_at` (and `version`) is unchanged, so unchanged
+        documents are never preprocessed twice.
+        
+        Args:
+            resource: Django model instance the text belongs to
+            text (str): Raw text of the resource (built by the caller)
+            variant (str): Distinguishes different texts of the same resource
+            version: Extra freshness stamp for text not covered by `updated_at`
+            
+        Returns:
+            str: Preprocessed text
+        """
+        updated_at = getattr(resource, 'updated_at', None)
+        if resource.pk is None or updated_at is None:
+            return self.preprocess_text(text)
+        
+        key = (resource._meta.label_lower, resource.pk, variant)
+        stamp = (updated_at, version)
+        with self._documents_lock:
+            cached = self._documents.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._documents.move_to_end(key)
+                return cached[1]
+        
+        processed = self.preprocess_text(text)
+        with self._documents_lock:
+            self._documents[key] = (stamp, processed)
+            self._documents.move_to_end(key)
+            while len(self._documents) > DOCUMENT_CACHE_SIZE:
+                self._documents.popitem(last=False)
+        return processed
+    
+    def cache_info(self) -> Dict[str, int]:
+        """Sizes and hit counts of the preprocessing caches"""
+        stems = self.stem.cache_info()
+        return {
+            'stem_hits': stems.hits,
+            'stem_misses': stems.misses,
+            'stems': stems.currsize,
+            'documents': len(self._documents),
+        }
+    
     def extract_document_text(self, resource) -> str:
         """
         Extract and combine all searchable text from a resource
@@ -149,7 +219,20 @@ class EnhancedSearchEngine:
         """
         if not query or not documents:
             return []
-        
+
+        # Use the prebuilt index when available: transform the query and dot it
+        # against stored document vectors instead of refitting on every search
+        from .search_index import get_search_index
+        index = get_search_index()
+        if index is not None:
+            try:
+                similarities = index.score_documents(query, documents)
+                results = [(doc, similarities[i]) for i, doc in enumerate(documents) if similarities[i] > 0]
+                results.sort(key=lambda x: x[1], reverse=True)
+                return results
+            except Exception as e:
+                logger.exception(f"Search index scoring failed: {e}")
+
         # Preprocess query
         processed_query = self.preprocess_text(query)
         
@@ -157,7 +240,7 @@ class EnhancedSearchEngine:
         doc_texts = []
         for doc in documents:
             raw_text = self.extract_document_text(doc)
-            processed_text = self.preprocess_text(raw_text)
+            processed_text = self.preprocess_document(doc, raw_text)
             doc_texts.append(processed_text)
         
         # Add query to corpus for vectorization
@@ -173,6 +256,7 @@ class EnhancedSearchEngine:
             doc_vectors = tfidf_matrix[1:]
             
             # Calculate cosine similarity
+            from sklearn.metrics.pairwise import cosine_similarity
             similarities = cosine_similarity(query_vector, doc_vectors).flatten()
             
             # Create results with scores
@@ -330,6 +414,64 @@ def get_search_statistics(query: str, results: Dict[str, List[Any]]) -> Dict[str
     }
 
 
+def rank_by_tf_idf(query: str, documents: List[Any]) -> List[Any]:
+    """
+    Rank documents by the summed TF-IDF weight of the query's terms
+    
+    Each document (title, description and content) is tokenized once into a
+    sparse term-count matrix; document frequencies and scores for all
+    documents are then computed with sparse column operations.
+    
+    TF(t,d) = count of t in d / number of terms in d
+    IDF(t) = log(number of documents / number of documents containing t)
+    
+    Args:
+        query (str): Search query
+        documents (List[Any]): Resource objects to rank
+        
+    Returns:
+        List[Any]: Documents with a positive score, best first
+    """
+    query_terms = Counter(re.findall(r'\b\w+\b', query.lower()))
+    if not query_terms or not documents:
+        return []
+    
+    import numpy as np
+    from sklearn.feature_extraction.text import CountVectorizer
+    
+    doc_texts = [
+        f"{doc.title} {getattr(doc, 'description', '')} {getattr(doc, 'content', '')}"
+        for doc in documents
+    ]
+    vectorizer = CountVectorizer(token_pattern=r'(?u)\b\w+\b', lowercase=True)
+    try:
+        counts = vectorizer.fit_transform(doc_texts).tocsc()
+    except ValueError:
+        # No tokens in any document
+        return []
+    
+    columns, weights = [], []
+    for term, occurrences in query_terms.items():
+        column = vectorizer.vocabulary_.get(term)
+        if column is not None:
+            columns.append(column)
+            weights.append(occurrences)
+    if not columns:
+        return []
+    
+    doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+    term_counts = counts[:, columns]
+    doc_freq = np.asarray((term_counts > 0).sum(axis=0)).ravel()
+    idf = np.log(len(documents) / doc_freq)
+    
+    # (docs x terms) counts . (idf * query weight) / doc length
+    scores = term_counts @ (idf * np.asarray(weights, dtype=float))
+    scores = np.divide(scores, doc_lengths, out=np.zeros_like(scores), where=doc_lengths > 0)
+    
+    order = np.argsort(-scores, kind='stable')
+    return [documents[i] for i in order if scores[i] > 0]
+
+
 def get_tfidf_similarity(text1: str, text2: str) -> float:
     """
     Calculate TF-IDF based cosine similarity between two text strings.
@@ -353,6 +495,8 @@ def get_tfidf_similarity(text1: str, text2: str) -> float:
             return 0.0
         
         # Create TF-IDF vectors
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
         vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words='english',
@@ -1,3 +1,459 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import fitz
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.fields.files import FieldFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    admin_stats, counters, event_log, recommend_utils, recommendation_batch, recommendation_cache, search_index,
+    text_extraction, trending
+)
+from .models import (
+    Faculty, Subject, Syllabus, Note, ViewLog, ResourcePopularity, ResourceSimilarity, SubjectPopularity, ResourceText,
+    UserRecommendation, RESOURCE_MODELS
+)
+from .search_backend import UnionSearchResults, search_querysets
+from .search_utils import rank_by_tf_idf
+
+
+def create_catalogue():
+    """A faculty with two subjects and a few approved resources"""
+    faculty = Faculty.objects.create(name='BSc CSIT', slug='bsccsit')
+    algorithms = Subject.objects.create(name='Algorithm Design', faculty=faculty, level=3)
+    databases = Subject.objects.create(name='Database Management System', faculty=faculty, level=4)
+    syllabus = Syllabus.objects.create(
+        subject=algorithms, title='Algorithm syllabus', content='Sorting, searching and graphs', status='approved'
+    )
+    note = Note.objects.create(
+        subject=databases, title='Relational algebra', file='notes/algebra.pdf',
+        description='Algorithm for query evaluation', status='approved'
+    )
+    Note.objects.create(subject=databases, title='Algorithm drafts', file='notes/drafts.pdf', status='pending')
+    return faculty, algorithms, databases, syllabus, note
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        _, _, _, self.syllabus, self.note = create_catalogue()
+
+    def test_saved_index_loads_and_scores_the_same(self):
+        index = search_index.SearchIndex.build()
+        self.assertEqual(set(index.keys), {('syllabus', self.syllabus.pk), ('note', self.note.pk)})
+        documents = [self.syllabus, self.note]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = index.save(os.path.join(directory, 'search_index', 'tfidf_index.joblib'))
+            loaded = search_index.SearchIndex.load(path)
+
+        self.assertEqual(loaded.keys, index.keys)
+        scores = loaded.score_documents('relational algebra', documents)
+        self.assertEqual(list(scores), list(index.score_documents('relational algebra', documents)))
+        self.assertEqual(scores[0], 0)
+        self.assertGreater(scores[1], 0)
+
+    def test_missing_index_loads_as_none(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(search_index.SearchIndex.load(os.path.join(directory, 'tfidf_index.joblib')))
+
+    def test_build_if_missing_keeps_an_existing_index(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(SEARCH_INDEX_PATH=os.path.join(directory, 'tfidf_index.joblib')):
+            call_command('build_search_index', '--if-missing', stdout=StringIO())
+            self.assertEqual(len(search_index.SearchIndex.load()), 2)
+
+            with mock.patch.object(search_index.SearchIndex, 'build') as build:
+                call_command('build_search_index', '--if-missing', stdout=StringIO())
+            build.assert_not_called()
+
+
+@override_settings(SEARCH_INDEX_UPDATE_DELAY=3600, RESOURCE_TEXT_EXTRACT_ON_SAVE=False)
+class SearchIndexUpdateTests(TestCase):
+    def tearDown(self):
+        with search_index._pending_lock:
+            search_index._pending_keys.clear()
+            if search_index._flush_timer is not None:
+                search_index._flush_timer.cancel()
+                search_index._flush_timer = None
+
+    def test_update_is_queued_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            _, _, _, syllabus, _ = create_catalogue()
+            self.assertNotIn(('syllabus', syllabus.pk), search_index._pending_keys)
+
+        for callback in callbacks:
+            callback()
+        self.assertIn(('syllabus', syllabus.pk), search_index._pending_keys)
+
+
+class SimilarityTableTests(TestCase):
+    def setUp(self):
+        self.faculty, _, self.databases, _, self.note = create_catalogue()
+        self.exercises = Note.objects.create(
+            subject=self.databases, title='Relational algebra exercises', file='notes/exercises.pdf',
+            description='Relational algebra and query evaluation', status='approved'
+        )
+
+    def test_table_stores_neighbours_of_each_resource(self):
+        written = recommend_utils.build_similarity_table(self.faculty)
+        self.assertGreater(written, 0)
+        self.assertTrue(ResourceSimilarity.objects.filter(
+            content_type='note', content_id=self.note.pk,
+            similar_content_type='note', similar_content_id=self.exercises.pk,
+        ).exists())
+
+        similar, _ = recommend_utils.get_similar_resources(self.note)[0]
+        self.assertEqual((similar.resource_type, similar.pk), ('note', self.exercises.pk))
+
+    def test_rebuild_replaces_the_faculty_rows(self):
+        written = recommend_utils.build_similarity_table(self.faculty)
+        self.assertEqual(recommend_utils.build_similarity_table(self.faculty), written)
+        self.assertEqual(ResourceSimilarity.objects.filter(faculty=self.faculty).count(), written)
+
+
+class ResourcePopularityTests(TestCase):
+    def setUp(self):
+        self.faculty, _, _, self.syllabus, self.note = create_catalogue()
+
+    def test_rows_follow_approval_status(self):
+        self.assertEqual(
+            set(ResourcePopularity.objects.values_list('content_type', 'content_id')),
+            {('syllabus', self.syllabus.pk), ('note', self.note.pk)},
+        )
+        self.note.status = 'rejected'
+        self.note.save()
+        self.assertFalse(ResourcePopularity.objects.filter(content_type='note', content_id=self.note.pk).exists())
+
+    def test_trending_is_ranked_by_popularity(self):
+        Note.objects.filter(pk=self.note.pk).update(view_count=10)
+        self.assertEqual(recommend_utils.refresh_resource_popularity(), 2)
+
+        trending = recommend_utils.get_trending_resources(self.faculty)
+        self.assertEqual(
+            [(resource.resource_type, resource.pk) for resource, _ in trending],
+            [('note', self.note.pk), ('syllabus', self.syllabus.pk)],
+        )
+
+
+@override_settings(COUNTER_BUFFERING=True, COUNTER_FLUSH_INTERVAL=3600)
+class CounterBufferTests(TestCase):
+    def setUp(self):
+        _, _, _, self.syllabus, _ = create_catalogue()
+        counters.flush_counters()
+
+    def tearDown(self):
+        counters._take_pending()
+
+    def test_delta_is_applied_after_flush(self):
+        counters.increment(self.syllabus, 'view_count', 2, touch=['last_viewed'])
+        counters.increment(self.syllabus, 'view_count')
+        self.assertEqual(Syllabus.objects.get(pk=self.syllabus.pk).view_count, 0)
+
+        self.assertEqual(counters.flush_counters(), 1)
+        refreshed = Syllabus.objects.get(pk=self.syllabus.pk)
+        self.assertEqual(refreshed.view_count, 3)
+        self.assertIsNotNone(refreshed.last_viewed)
+
+    def test_failed_flush_keeps_delta(self):
+        counters.increment(self.syllabus, 'download_count', 4)
+        flushed_rows = counters.stats['flushed_rows']
+
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=Exception('database down')):
+            self.assertEqual(counters.flush_counters(), 0)
+        self.assertEqual(counters.stats['flushed_rows'], flushed_rows)
+        self.assertEqual(Syllabus.objects.get(pk=self.syllabus.pk).download_count, 0)
+
+        self.assertEqual(counters.flush_counters(), 1)
+        self.assertEqual(Syllabus.objects.get(pk=self.syllabus.pk).download_count, 4)
+
+
+@override_settings(
+    EVENT_LOG_ASYNC=True, EVENT_LOG_FLUSH_INTERVAL=3600, EVENT_LOG_BATCH_SIZE=1000,
+    RESOURCE_TEXT_EXTRACT_ON_SAVE=False,
+)
+class EventLogTests(TransactionTestCase):
+    def test_flush_at_exit_writes_queued_events(self):
+        _, _, _, syllabus, _ = create_catalogue()
+        for _ in range(3):
+            event_log.log_view(None, 'syllabus', syllabus.pk)
+
+        event_log._flush_at_exit()
+        self.assertEqual(ViewLog.objects.filter(content_type='syllabus', content_id=syllabus.pk).count(), 3)
+        self.assertEqual(event_log.get_metrics()['queued'], 0)
+
+
+class AdminStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.faculty, self.algorithms, self.databases, _, _ = create_catalogue()
+
+    def test_counts_match_per_model_queries(self):
+        stats = admin_stats.AdminStatistics()
+        for content_type, model in RESOURCE_MODELS.items():
+            for status in (None,) + admin_stats.STATUSES:
+                resources = model.objects.filter(status=status) if status else model.objects.all()
+                self.assertEqual(stats.count(content_type, status), resources.count())
+                for level in (self.algorithms.level, self.databases.level):
+                    self.assertEqual(
+                        stats.count(content_type, status, self.faculty.pk, level),
+                        resources.filter(subject__faculty=self.faculty, subject__level=level).count(),
+                    )
+
+    def test_snapshot_is_invalidated_by_changes(self):
+        self.assertEqual(admin_stats.get_admin_statistics().count('note', 'pending'), 1)
+        Note.objects.create(subject=self.algorithms, title='Greedy algorithms', file='notes/greedy.pdf', status='pending')
+        self.assertEqual(admin_stats.get_admin_statistics().count('note', 'pending'), 2)
+
+
+class UnionSearchTests(TestCase):
+    def setUp(self):
+        self.faculty, self.algorithms, self.databases, self.syllabus, self.note = create_catalogue()
+
+    def test_results_are_ordered_and_paginated_in_the_database(self):
+        results = UnionSearchResults(search_querysets('algorithm'))
+        rows = results.rows()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            {(kind, pk) for kind, pk, _, _ in rows},
+            {('subject', self.algorithms.pk), ('syllabus', self.syllabus.pk)},
+        )
+        ranks = [rank for _, _, rank, _ in rows]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertEqual(len(results[1:2]), 1)
+
+    def test_exact_subject_name_ranks_first(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest('Subjects are only ranked with PostgreSQL full-text search')
+        kind, pk, rank, _ = UnionSearchResults(search_querysets('Database Management System')).rows()[0]
+        self.assertEqual((kind, pk), ('subject', self.databases.pk))
+        self.assertGreater(rank, 0)
+
+    def test_facets_count_every_kind_faculty_and_level(self):
+        facets = UnionSearchResults(search_querysets('algorithm')).facets()
+        self.assertEqual(facets.total, 2)
+        self.assertEqual(facets.types['subject'], 1)
+        self.assertEqual(facets.types['syllabus'], 1)
+        self.assertEqual(facets.types['questionbank'], 0)
+        self.assertEqual(facets.faculties, {self.faculty.pk: 2})
+        self.assertEqual(facets.levels, {3: 2})
+
+
+class TfIdfRankingTests(SimpleTestCase):
+    def setUp(self):
+        self.graphs = SimpleNamespace(title='Graph algorithms', description='graph search')
+        self.sorting = SimpleNamespace(title='Sorting', description='sorting algorithms')
+        self.databases = SimpleNamespace(title='Databases', content='')
+
+    def test_documents_are_ranked_by_summed_term_weight(self):
+        documents = [self.graphs, self.sorting, self.databases]
+        self.assertEqual(rank_by_tf_idf('graph', documents), [self.graphs])
+        self.assertEqual(rank_by_tf_idf('sorting algorithms', documents), [self.sorting, self.graphs])
+
+    def test_terms_in_every_document_do_not_score(self):
+        self.assertEqual(rank_by_tf_idf('algorithms', [self.graphs, self.sorting]), [])
+        self.assertEqual(rank_by_tf_idf('trees', [self.graphs]), [])
+
+
+class RecommendationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_catalogue()
+        self.user = User.objects.create_user('student')
+
+    def test_stale_entry_is_served_and_refreshed(self):
+        recommendation_cache.get_cached_recommendations(self.user, limit=5)
+        key = recommendation_cache.cache_key(self.user.id)
+        entries = cache.get(key)
+        entries[5]['fresh_until'] = 0
+        computed_at = entries[5]['computed_at']
+        cache.set(key, entries)
+
+        with mock.patch.object(
+            recommendation_cache, '_refresh_in_background', side_effect=recommendation_cache._compute_and_store
+        ) as refresh:
+            recommendations = recommendation_cache.get_cached_recommendations(self.user, limit=5)
+
+        refresh.assert_called_once_with(self.user, 5)
+        self.assertEqual(set(recommendations), {'trending', 'similar', 'personalized'})
+        entry = cache.get(key)[5]
+        self.assertGreater(entry['fresh_until'], time.time())
+        self.assertGreaterEqual(entry['computed_at'], computed_at)
+
+    def test_fresh_entry_is_not_recomputed(self):
+        recommendation_cache.get_cached_recommendations(self.user, limit=5)
+        with mock.patch.object(recommendation_cache, '_refresh_in_background') as refresh:
+            recommendation_cache.get_cached_recommendations(self.user, limit=5)
+        refresh.assert_not_called()
+
+    @override_settings(RECOMMENDATION_WAIT_TIMEOUT=0.1)
+    def test_waiting_for_a_stuck_computation_is_capped(self):
+        cache.add(recommendation_cache._lock_key(self.user.id, 5), True, 60)
+        start = time.monotonic()
+        recommendations = recommendation_cache.get_cached_recommendations(self.user, limit=5)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(recommendations['personalized'], [])
+
+
+@override_settings(RESOURCE_TEXT_EXTRACT_ON_SAVE=False)
+class PrecomputedRecommendationTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, _, self.syllabus, self.note = create_catalogue()
+        self.user = User.objects.create_user('student')
+        ViewLog.objects.create(user=self.user, content_type='note', content_id=self.note.pk)
+
+    def test_stored_lists_are_served_without_computing(self):
+        self.assertEqual(recommendation_batch.active_user_ids(), [self.user.id])
+        self.assertEqual(recommendation_batch.precompute_user_recommendations([self.user.id], limit=5, workers=1), (1, 0))
+        expected, _, items = recommendation_cache.compute_user_segments(self.user, 5)
+        self.assertEqual(UserRecommendation.objects.get(user=self.user).items, items)
+
+        cache.clear()
+        with mock.patch('student_app.recommend_utils.get_user_recommendations') as compute:
+            recommendations = recommendation_cache.get_cached_recommendations(self.user, limit=5)
+        compute.assert_not_called()
+        for kind in recommendation_cache.USER_SEGMENTS:
+            self.assertEqual(recommendations[kind], expected[kind])
+
+    def test_hydration_skips_resources_that_are_no_longer_approved(self):
+        items = recommendation_batch.serialize_recommendations({
+            'similar': [(self.note, 'Similar to what you viewed')],
+            'personalized': [(self.syllabus, 'From your subjects')],
+        })
+        self.assertEqual(items['similar'], [['note', self.note.pk, 'Similar to what you viewed']])
+
+        Syllabus.objects.filter(pk=self.syllabus.pk).update(status='rejected')
+        recommendations = recommendation_batch.hydrate_recommendations(items, limit=5)
+        self.assertEqual(recommendations['similar'], [(self.note, 'Similar to what you viewed')])
+        self.assertEqual(recommendations['personalized'], [])
+        self.assertEqual(recommendations['trending'], [])
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=1, TRENDING_EVENT_LAG=300)
+class TrendingTests(TestCase):
+    def setUp(self):
+        _, self.algorithms, self.databases, self.syllabus, self.note = create_catalogue()
+        self.now = timezone.now()
+
+    def log_views(self, resource, minutes_ago, count=1):
+        ViewLog.objects.bulk_create(
+            ViewLog(
+                content_type=resource._meta.model_name, content_id=resource.pk,
+                viewed_at=self.now - timedelta(minutes=minutes_ago),
+            )
+            for _ in range(count)
+        )
+
+    def trending_score(self, resource):
+        return ResourcePopularity.objects.get(
+            content_type=resource._meta.model_name, content_id=resource.pk
+        ).trending_score
+
+    def test_scores_decay_between_passes(self):
+        self.log_views(self.syllabus, minutes_ago=60)
+        trending.update_trending_scores(now=self.now)
+        self.assertAlmostEqual(self.trending_score(self.syllabus), 0.5)
+
+        self.assertEqual(trending.update_trending_scores(now=self.now + timedelta(hours=1))['events'], 0)
+        self.assertAlmostEqual(self.trending_score(self.syllabus), 0.25)
+        self.assertAlmostEqual(SubjectPopularity.objects.get(subject=self.algorithms).trending_score, 0.25)
+
+    def test_events_are_scored_once_older_than_the_lag(self):
+        self.log_views(self.syllabus, minutes_ago=1)
+        self.assertEqual(trending.update_trending_scores(now=self.now)['events'], 0)
+
+        # Written after the first pass by a late event log batch
+        self.log_views(self.note, minutes_ago=2)
+        self.assertEqual(trending.update_trending_scores(now=self.now + timedelta(minutes=10))['events'], 2)
+        self.assertEqual(trending.update_trending_scores(now=self.now + timedelta(minutes=20))['events'], 0)
+
+    def test_resources_without_a_popularity_row_get_one(self):
+        ResourcePopularity.objects.all().delete()
+        self.log_views(self.note, minutes_ago=60, count=2)
+
+        self.assertEqual(trending.update_trending_scores(now=self.now)['resources'], 1)
+        self.assertAlmostEqual(self.trending_score(self.note), 1.0)
+        self.assertAlmostEqual(SubjectPopularity.objects.get(subject=self.databases).trending_score, 1.0)
+
+
+class TextExtractionTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        os.makedirs(os.path.join(media_root, 'notes'))
+        document = fitz.open()
+        for text in ('First normal form', 'Second normal form'):
+            document.new_page().insert_text((72, 72), text)
+        document.save(os.path.join(media_root, 'notes', 'normal-forms.pdf'))
+        document.close()
+
+        _, _, databases, _, _ = create_catalogue()
+        self.note = Note.objects.create(
+            subject=databases, title='Normal forms', file='notes/normal-forms.pdf', status='approved'
+        )
+
+    def stored_text(self):
+        return ResourceText.objects.filter(content_type='note', content_id=self.note.pk).first()
+
+    def test_unchanged_file_is_not_extracted_again(self):
+        self.assertEqual(text_extraction.extract_resource_text(self.note), 'extracted')
+        self.assertEqual(self.stored_text().text, 'First normal form Second normal form')
+        self.assertEqual(self.stored_text().page_count, 2)
+
+        with mock.patch.object(text_extraction, 'extract_pdf_text') as extract:
+            self.assertEqual(text_extraction.extract_resource_text(self.note), 'unchanged')
+        extract.assert_not_called()
+        self.assertEqual(text_extraction.extract_resource_text(self.note, force=True), 'extracted')
+
+    @override_settings(RESOURCE_TEXT_MAX_CHARS=20)
+    def test_text_is_cut_off_at_the_limit(self):
+        text_extraction.extract_resource_text(self.note)
+        self.assertEqual(self.stored_text().text, 'First normal form Se')
+        self.assertTrue(self.stored_text().truncated)
+
+    @override_settings(RESOURCE_TEXT_MAX_FILE_BYTES=100)
+    def test_remote_file_over_the_size_cap_is_not_read(self):
+        with mock.patch.object(FieldFile, 'path', new_callable=mock.PropertyMock, side_effect=NotImplementedError):
+            with self.assertRaises(ValueError):
+                text_extraction.extract_resource_text(self.note)
+        self.assertIsNone(self.stored_text())
+
+    def test_saving_an_approved_file_queues_extraction_after_commit(self):
+        with mock.patch.object(text_extraction, '_extract_in_background') as extract, \
+                mock.patch('student_app.search_index.schedule_index_update'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.note.title = 'Normal forms and BCNF'
+                self.note.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.note.view_count = 1
+                self.note.save(update_fields=['view_count'])
+        extract.assert_called_once_with('note', self.note.pk)
+
+
+class AdvancedSearchViewTests(TestCase):
+    def setUp(self):
+        _, _, _, self.syllabus, self.note = create_catalogue()
+        self.client.force_login(User.objects.create_user('student'))
+
+    def test_results_are_rendered_with_the_general_template(self):
+        response = self.client.get(reverse('advanced_search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'general/advanced_search.html')
+        self.assertEqual(set(response.context['page_obj']), {self.syllabus, self.note})
@@ -0,0 +1,190 @@
+"""
+Document Text Extraction for Student Portal
+
+Pulls the text out of uploaded PDF files so that resources can be searched by
+their contents, not only by title and description. Extraction never runs in
+a request: saving an approved resource queues it for a background thread once
+the transaction commits (schedule_text_extraction), and the
+extract_resource_text management command sweeps every approved resource:
+
+- pages are read one at a time with PyMuPDF and extraction stops once
+  RESOURCE_TEXT_MAX_CHARS characters have been collected;
+- text is whitespace-normalized and stored in ResourceText;
+- files whose SHA-256 matches the stored hash are skipped;
+- updated resources are re-indexed (TF-IDF index and, on PostgreSQL, the
+  search_vector column).
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import ResourceText, RESOURCE_MODELS
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def max_chars() -> int:
+    return getattr(settings, 'RESOURCE_TEXT_MAX_CHARS', 100_000)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and drop control characters"""
+    text = re.sub(r'[\x00-\x08\x0b-\x1f\x7f]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def file_hash(field_file) -> str:
+    """SHA-256 of a stored file, read in chunks"""
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _open_pdf(field_file):
+    import fitz  # PyMuPDF
+
+    try:
+        # Local storage: let MuPDF read the file itself
+        return fitz.open(field_file.path)
+    except NotImplementedError:
+        # Remote storage has no path; read the bytes (size-limited)
+        max_bytes = getattr(settings, 'RESOURCE_TEXT_MAX_FILE_BYTES', 50 * 1024 * 1024)
+        if field_file.size > max_bytes:
+            raise ValueError(f"File larger than {max_bytes} bytes")
+        with field_file.open('rb') as f:
+            return fitz.open(stream=f.read(), filetype='pdf')
+
+
+def extract_pdf_text(field_file, limit: Optional[int] = None) -> Tuple[str, int, bool]:
+    """
+    Extract normalized text from a PDF page by page
+
+    Args:
+        field_file: FieldFile of the uploaded PDF
+        limit (Optional[int]): Maximum number of characters to keep
+
+    Returns:
+        Tuple[str, int, bool]: Text, number of pages in the document and
+        whether the text was cut off at `limit`
+    """
+    limit = limit or max_chars()
+    parts, size = [], 0
+    truncated = False
+    document = _open_pdf(field_file)
+    try:
+        for page in document:
+            page_text = normalize_text(page.get_text())
+            if not page_text:
+                continue
+            if size + len(page_text) >= limit:
+                parts.append(page_text[:limit - size])
+                truncated = True
+                break
+            parts.append(page_text)
+            size += len(page_text) + 1
+        return ' '.join(parts), document.page_count, truncated
+    finally:
+        document.close()
+
+
+def extract_resource_text(resource, force: bool = False) -> str:
+    """
+    Extract and store the text of one resource's file
+
+    Args:
+        resource: Resource instance with a `file` field
+        force (bool): Re-extract even if the file hash is unchanged
+
+    Returns:
+        str: 'extracted', 'unchanged' or 'skipped'
+    """
+    field_file = getattr(resource, 'file', None)
+    if not field_file or not field_file.name.lower().endswith('.pdf'):
+        return 'skipped'
+
+    content_type = resource._meta.model_name
+    digest = file_hash(field_file)
+    existing = ResourceText.objects.filter(content_type=content_type, content_id=resource.pk).first()
+    if existing and existing.file_hash == digest and not force:
+        return 'unchanged'
+
+    text, page_count, truncated = extract_pdf_text(field_file)
+    ResourceText.objects.update_or_create(
+        content_type=content_type,
+        content_id=resource.pk,
+        defaults={'file_hash': digest, 'text': text, 'page_count': page_count, 'truncated': truncated},
+    )
+
+    from .search_backend import update_search_vector
+    from .search_index import schedule_index_update
+    update_search_vector(resource)
+    schedule_index_update(content_type, resource.pk)
+    return 'extracted'
+
+
+def schedule_text_extraction(content_type: str, resource_id: int) -> None:
+    """
+    Extract a saved resource's file text in the background after commit
+
+    Files whose hash is unchanged are skipped, so saves that do not replace
+    the file only cost a hash of it.
+
+    Args:
+        content_type (str): Resource type key (see RESOURCE_MODELS)
+        resource_id (int): Primary key of the resource
+    """
+    if getattr(settings, 'RESOURCE_TEXT_EXTRACT_ON_SAVE', True):
+        transaction.on_commit(lambda: _extract_in_background(content_type, resource_id))
+
+
+def _extract_in_background(content_type: str, resource_id: int) -> None:
+    def run():
+        try:
+            resource = RESOURCE_MODELS[content_type].objects.filter(pk=resource_id, status='approved').first()
+            if resource is not None:
+                extract_resource_text(resource)
+        except Exception:
+            logger.exception(f"Text extraction failed for {content_type} {resource_id}")
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'text-extraction-{content_type}-{resource_id}', daemon=True).start()
+
+
+def extract_all(content_types: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, int]:
+    """
+    Extract text for every approved resource with a file
+
+    Args:
+        content_types (Optional[Iterable[str]]): Resource types to process (all by default)
+        force (bool): Re-extract unchanged files too
+
+    Returns:
+        Dict[str, int]: Number of resources per outcome ('extracted',
+        'unchanged', 'skipped', 'failed')
+    """
+    outcome = {'extracted': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    for content_type in content_types or RESOURCE_MODELS:
+        model = RESOURCE_MODELS[content_type]
+        if not any(field.name == 'file' for field in model._meta.get_fields()):
+            continue
+        for resource in model.objects.filter(status='approved').exclude(file='').iterator():
+            try:
+                outcome[extract_resource_text(resource, force=force)] += 1
+            except Exception as e:
+                outcome['failed'] += 1
+                logger.error(f"Text extraction failed for {content_type} {resource.pk}: {e}")
+
+    from .search_index import flush_index_updates
+    flush_index_updates()
+    return outcome
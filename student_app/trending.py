@@ -0,0 +1,238 @@
+"""
+Trending Engine for Student Portal
+
+Trending scores are exponentially decayed counts of ViewLog and DownloadLog
+events. Every pass first decays all stored scores to the current time and then
+adds only the events logged since the stored watermark, so the cost of a pass
+is proportional to the new activity rather than to the full history.
+
+The watermark is a timestamp, and a pass only scores events that are at least
+TRENDING_EVENT_LAG seconds old. The async event log writes batches from
+several processes a few seconds after the events happened, so neither ids nor
+timestamps arrive in order; the lag leaves those batches time to land before
+their time range is consumed.
+
+Scores are kept on ResourcePopularity (per resource, filterable by faculty) and
+SubjectPopularity (per subject), which the trending views read with a single
+indexed LIMIT query. Until the first pass has filled SubjectPopularity (e.g.
+right after a deploy), subjects are ranked by a live count of their recent
+uploads instead.
+"""
+
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import (
+    Subject, ViewLog, DownloadLog, ResourcePopularity, SubjectPopularity, TrendingState,
+    RESOURCE_MODELS
+)
+from .recommend_utils import get_resources_by_keys, popularity_row
+
+# Event weights, mirroring popularity_score()
+VIEW_WEIGHT = 1.0
+VIVA_VIEW_WEIGHT = 1.5
+DOWNLOAD_WEIGHT = 2.0
+
+LOG_CHUNK_SIZE = 2000
+
+
+def decay_rate():
+    """Decay constant (per second) for the configured half-life"""
+    half_life_hours = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72)
+    return math.log(2) / (half_life_hours * 3600)
+
+
+def event_lag():
+    """How old (timedelta) a logged event must be before a pass scores it"""
+    return timedelta(seconds=getattr(settings, 'TRENDING_EVENT_LAG', 300))
+
+
+def _collect_events(queryset, time_field, weight_for, since, until, now, rate, resource_deltas, subject_deltas):
+    """
+    Accumulate decayed weights of log rows logged after `since` and up to `until`.
+
+    Returns:
+        Number of rows read
+    """
+    if since is not None:
+        queryset = queryset.filter(**{f'{time_field}__gt': since})
+    rows = queryset.filter(**{f'{time_field}__lte': until}).order_by().values_list(
+        'content_type', 'content_id', time_field
+    )
+    count = 0
+    for content_type, content_id, logged_at in rows.iterator(chunk_size=LOG_CHUNK_SIZE):
+        count += 1
+        age = max((now - logged_at).total_seconds(), 0)
+        weight = weight_for(content_type) * math.exp(-rate * age)
+        if content_type == 'subject':
+            subject_deltas[content_id] += weight
+        elif content_type in RESOURCE_MODELS:
+            resource_deltas[(content_type, content_id)] += weight
+    return count
+
+
+def _view_weight(content_type):
+    return VIVA_VIEW_WEIGHT if content_type == 'viva' else VIEW_WEIGHT
+
+
+def _download_weight(content_type):
+    return DOWNLOAD_WEIGHT
+
+
+def _apply_resource_deltas(resource_deltas, subject_deltas):
+    """
+    Add resource deltas to ResourcePopularity and roll them up to subjects
+
+    Approved resources without a row yet get one; deltas of resources that
+    were deleted or are not approved are dropped.
+    """
+    ids_by_type = defaultdict(list)
+    for content_type, content_id in resource_deltas:
+        ids_by_type[content_type].append(content_id)
+
+    updated = []
+    for content_type, ids in ids_by_type.items():
+        updated.extend(ResourcePopularity.objects.filter(content_type=content_type, content_id__in=ids))
+
+    existing = {(row.content_type, row.content_id) for row in updated}
+    created = [
+        popularity_row(resource)
+        for resource in get_resources_by_keys(key for key in resource_deltas if key not in existing)
+    ]
+
+    for row in updated + created:
+        delta = resource_deltas[(row.content_type, row.content_id)]
+        row.trending_score += delta
+        if row.subject_id:
+            subject_deltas[row.subject_id] += delta
+
+    ResourcePopularity.objects.bulk_update(updated, ['trending_score'], batch_size=500)
+    ResourcePopularity.objects.bulk_create(
+        created,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['content_type', 'content_id'],
+        update_fields=['trending_score'],
+    )
+    return len(updated) + len(created)
+
+
+def _apply_subject_deltas(subject_deltas):
+    """Add subject deltas to SubjectPopularity, creating missing rows"""
+    existing = SubjectPopularity.objects.in_bulk(list(subject_deltas))
+    updated, created = [], []
+    for subject_id, delta in subject_deltas.items():
+        row = existing.get(subject_id)
+        if row is not None:
+            row.trending_score += delta
+            updated.append(row)
+
+    missing = [subject_id for subject_id in subject_deltas if subject_id not in existing]
+    for subject_id, faculty_id in Subject.objects.filter(id__in=missing).values_list('id', 'faculty_id'):
+        created.append(SubjectPopularity(
+            subject_id=subject_id,
+            faculty_id=faculty_id,
+            trending_score=subject_deltas[subject_id],
+        ))
+
+    SubjectPopularity.objects.bulk_update(updated, ['trending_score'], batch_size=500)
+    SubjectPopularity.objects.bulk_create(created, batch_size=500)
+    return len(updated) + len(created)
+
+
+def update_trending_scores(now=None):
+    """
+    Run one incremental trending pass.
+
+    Args:
+        now: Time to decay scores to (defaults to the current time)
+
+    Returns:
+        Dict with the number of new events and rows touched
+    """
+    now = now or timezone.now()
+    rate = decay_rate()
+
+    with transaction.atomic():
+        state, _ = TrendingState.objects.select_for_update().get_or_create(pk=1)
+
+        # Bring every stored score forward to `now` in one UPDATE per table
+        if state.scored_at and now > state.scored_at:
+            factor = math.exp(-rate * (now - state.scored_at).total_seconds())
+            ResourcePopularity.objects.filter(trending_score__gt=0).update(
+                trending_score=F('trending_score') * factor
+            )
+            SubjectPopularity.objects.filter(trending_score__gt=0).update(
+                trending_score=F('trending_score') * factor
+            )
+
+        # Younger events may still be waiting in an event log flusher's batch
+        since = state.events_until
+        until = now - event_lag()
+        if since is not None:
+            until = max(until, since)
+
+        resource_deltas = defaultdict(float)
+        subject_deltas = defaultdict(float)
+        views = _collect_events(
+            ViewLog.objects.all(), 'viewed_at', _view_weight, since, until,
+            now, rate, resource_deltas, subject_deltas
+        )
+        downloads = _collect_events(
+            DownloadLog.objects.all(), 'downloaded_at', _download_weight, since, until,
+            now, rate, resource_deltas, subject_deltas
+        )
+
+        resources = _apply_resource_deltas(resource_deltas, subject_deltas) if resource_deltas else 0
+        subjects = _apply_subject_deltas(subject_deltas) if subject_deltas else 0
+
+        state.events_until = until
+        state.scored_at = max(now, state.scored_at) if state.scored_at else now
+        state.save()
+
+    return {'events': views + downloads, 'resources': resources, 'subjects': subjects}
+
+
+def get_trending_subjects(faculty=None, limit=5):
+    """
+    Subjects ranked by decayed activity.
+
+    Args:
+        faculty: Optional Faculty to restrict the ranking to
+        limit: Maximum number of subjects
+
+    Returns:
+        List of Subject instances annotated with `recent_activity`
+    """
+    if not SubjectPopularity.objects.exists():
+        return _live_trending_subjects(faculty, limit)
+
+    rows = SubjectPopularity.objects.filter(trending_score__gt=0).select_related('subject__faculty')
+    if faculty is not None:
+        rows = rows.filter(faculty=faculty)
+
+    subjects = []
+    for row in rows.order_by('-trending_score')[:limit]:
+        subject = row.subject
+        subject.recent_activity = round(row.trending_score, 2)
+        subjects.append(subject)
+    return subjects
+
+
+def _live_trending_subjects(faculty=None, limit=5):
+    """Subjects ranked by uploads in the last week (before the first trending pass)"""
+    week_ago = timezone.now() - timedelta(days=7)
+    subjects = Subject.objects.annotate(
+        recent_activity=Count('syllabi', filter=Q(syllabi__created_at__gte=week_ago)) +
+                        Count('notes', filter=Q(notes__created_at__gte=week_ago)) +
+                        Count('question_banks', filter=Q(question_banks__created_at__gte=week_ago))
+    ).filter(recent_activity__gt=0)
+    if faculty is not None:
+        subjects = subjects.filter(faculty=faculty)
+    return list(subjects.select_related('faculty').order_by('-recent_activity')[:limit])
@@ -85,6 +85,7 @@ urlpatterns = [
     # API endpoints
     path('api/toggle-dark-mode/', views.toggle_dark_mode, name='toggle_dark_mode'),
     path('api/trending-subjects/', views.get_trending_subjects, name='get_trending_subjects'),
+    path('api/autocomplete/', views.autocomplete, name='autocomplete'),
     path('api/subjects/<int:faculty_id>/', views.get_subjects_for_faculty, name='get_subjects_for_faculty'),
     
     # Additional resource URLs (redirect to search with filters)
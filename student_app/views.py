@@ -30,22 +30,20 @@ from .forms import (
     ResourceFilterForm, AdvancedSearchForm, MCQQuestionForm, MCQOptionForm,
     MCQQuizForm, FacultySelectionForm, SubjectSelectionForm
 )
-
-def invalidate_user_recommendations_cache(user_id):
-    """Invalidate user recommendations cache when user activity changes"""
-    cache_key = f"user_recommendations_{user_id}"
-    cache.delete(cache_key)
-
+from .trending import get_trending_subjects as get_trending_subjects_ranking
+from .event_log import log_view, log_download
+from .admin_stats import get_admin_statistics
+from .search_backend import (
+    UnionSearchResults, cached_search_results, match_text, normalize_query, result_key, search_querysets
+)
+from .search_utils import rank_by_tf_idf
+from .autocomplete import autocomplete as autocomplete_suggestions
+from .recommendation_cache import get_cached_recommendations, record_user_activity
 
 def home(request):
     latest_notices = Notice.objects.filter(is_general=True, is_important=True).order_by('-created_at')[:3]
     
-    week_ago = timezone.now() - timedelta(days=7)
-    trending_subjects = Subject.objects.annotate(
-        recent_activity=Count('syllabi', filter=Q(syllabi__created_at__gte=week_ago)) +
-                        Count('notes', filter=Q(notes__created_at__gte=week_ago)) +
-                        Count('question_banks', filter=Q(question_banks__created_at__gte=week_ago))
-    ).filter(recent_activity__gt=0).order_by('-recent_activity')[:6]
+    trending_subjects = get_trending_subjects_ranking(limit=6)
     
     recent_resources = []
     recent_syllabi = Syllabus.objects.filter(status='approved').order_by('-created_at')[:3]
@@ -70,25 +68,8 @@ def home(request):
     # Get recommendations for authenticated users (excluding admins)
     recommendations = None
     if request.user.is_authenticated and not request.user.is_superuser:
-        from .recommend_utils import get_user_recommendations, get_user_faculty
-        
-        # Create a cache key that includes user ID and recent activity timestamp
-        # This ensures recommendations update when user activity changes
-        user_activity_key = f"user_recommendations_{request.user.id}"
-        
-        # Check if we have cached recommendations
-        recommendations = cache.get(user_activity_key)
-        
-        if not recommendations:
-            # Generate fresh recommendations
-            recommendations = get_user_recommendations(request.user, limit=6)
-            # Cache for 10 minutes - short enough to feel dynamic, long enough to be efficient
-            cache.set(user_activity_key, recommendations, 600)
-        else:
-            # For better user experience, we can also generate fresh recommendations
-            # in the background and update cache asynchronously
-            recommendations = get_user_recommendations(request.user, limit=6)
-            cache.set(user_activity_key, recommendations, 600)
+        # Served from cache; refreshed in the background once stale
+        recommendations = get_cached_recommendations(request.user, limit=6)
     
     context = {
         'latest_notices': latest_notices,
@@ -295,14 +276,9 @@ def subject_detail(request, subject_id):
     
     # Increment view count if user is authenticated
     if request.user.is_authenticated:
-        ViewLog.objects.create(
-            user=request.user,
-            content_type='subject',
-            content_id=subject_id,
-            ip_address=request.META.get('REMOTE_ADDR')
-        )
-        # Invalidate user recommendations cache to ensure dynamic updates
-        invalidate_user_recommendations_cache(request.user.id)
+        log_view(request.user, 'subject', subject_id, request.META.get('REMOTE_ADDR'))
+        # Count the activity; recommendations refresh after enough of it
+        record_user_activity(request.user.id)
     
     notices = Notice.objects.filter(subject=subject, is_general=False)
     syllabus = Syllabus.objects.filter(subject=subject, status='approved').first()
@@ -505,35 +481,62 @@ def login_page(request):
     return render(request, 'auth/login.html')
 
 
-def calculate_tf_idf(query, documents):
-    """Simple TF-IDF implementation for search ranking"""
-    query_terms = re.findall(r'\b\w+\b', query.lower())
-    query_tf = Counter(query_terms)
+def _advanced_search_results(query, faculty, subject, levels, resource_types, sort_by):
+    """Approved notes, syllabi and question banks matching the advanced search form, ranked and sorted"""
+    # Get all approved resources
+    notes = Note.objects.filter(status='approved').select_related('subject', 'subject__faculty')
+    syllabi = Syllabus.objects.filter(status='approved').select_related('subject', 'subject__faculty')
+    questionbanks = QuestionBank.objects.filter(status='approved').select_related('subject', 'subject__faculty')
+
+    # Apply filters
+    if faculty:
+        notes = notes.filter(subject__faculty=faculty)
+        syllabi = syllabi.filter(subject__faculty=faculty)
+        questionbanks = questionbanks.filter(subject__faculty=faculty)
+
+    if subject:
+        notes = notes.filter(subject=subject)
+        syllabi = syllabi.filter(subject=subject)
+        questionbanks = questionbanks.filter(subject=subject)
+
+    if levels:
+        notes = notes.filter(subject__level__in=levels)
+        syllabi = syllabi.filter(subject__level__in=levels)
+        questionbanks = questionbanks.filter(subject__level__in=levels)
+
+    # Apply text search (indexed full-text search on PostgreSQL)
+    if query:
+        notes = match_text(notes, 'note', query)
+        syllabi = match_text(syllabi, 'syllabus', query)
+        questionbanks = match_text(questionbanks, 'questionbank', query)
+
+    # Combine results
+    all_results = []
+    if not resource_types or 'note' in resource_types:
+        all_results.extend(list(notes))
+    if not resource_types or 'syllabus' in resource_types:
+        all_results.extend(list(syllabi))
+    if not resource_types or 'questionbank' in resource_types:
+        all_results.extend(list(questionbanks))
+
+    # Apply TF-IDF ranking if query provided
+    if query and all_results:
+        results = rank_by_tf_idf(query, all_results)
+    else:
+        results = all_results
+
+    # Apply sorting
+    if sort_by == 'newest':
+        results.sort(key=lambda x: x.created_at, reverse=True)
+    elif sort_by == 'oldest':
+        results.sort(key=lambda x: x.created_at)
+    elif sort_by == 'downloads':
+        results.sort(key=lambda x: x.download_count, reverse=True)
+    elif sort_by == 'views':
+        results.sort(key=lambda x: x.view_count, reverse=True)
     
-    results = []
-    for doc in documents:
-        # Get document text (title + description)
-        doc_text = f"{doc.title} {getattr(doc, 'description', '')} {getattr(doc, 'content', '')}"
-        doc_terms = re.findall(r'\b\w+\b', doc_text.lower())
-        doc_tf = Counter(doc_terms)
-        
-        # Calculate TF-IDF score
-        score = 0
-        for term in query_terms:
-            if term in doc_tf:
-                # Simple TF-IDF: tf * idf
-                tf = doc_tf[term] / len(doc_terms) if doc_terms else 0
-                # Count documents containing this term
-                doc_count = sum(1 for d in documents if term in f"{d.title} {getattr(d, 'description', '')} {getattr(d, 'content', '')}".lower())
-                idf = math.log(len(documents) / doc_count) if doc_count > 0 else 0
-                score += tf * idf
-        
-        if score > 0:
-            results.append((doc, score))
-    
-    # Sort by score
-    results.sort(key=lambda x: x[1], reverse=True)
-    return [doc for doc, score in results]
+    return results
+
 
 @login_required
 def advanced_search(request):
@@ -563,57 +566,18 @@ def advanced_search(request):
         if resource_type:
             resource_types = [resource_type]
         
-        # Get all approved resources
-        notes = Note.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-        syllabi = Syllabus.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-        questionbanks = QuestionBank.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-        
-        # Apply filters
-        if faculty:
-            notes = notes.filter(subject__faculty=faculty)
-            syllabi = syllabi.filter(subject__faculty=faculty)
-            questionbanks = questionbanks.filter(subject__faculty=faculty)
-        
-        if subject:
-            notes = notes.filter(subject=subject)
-            syllabi = syllabi.filter(subject=subject)
-            questionbanks = questionbanks.filter(subject=subject)
-        
-        if levels:
-            notes = notes.filter(subject__level__in=levels)
-            syllabi = syllabi.filter(subject__level__in=levels)
-            questionbanks = questionbanks.filter(subject__level__in=levels)
-        
-        # Apply text search
-        if query:
-            notes = notes.filter(Q(title__icontains=query) | Q(description__icontains=query))
-            syllabi = syllabi.filter(Q(title__icontains=query) | Q(content__icontains=query))
-            questionbanks = questionbanks.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        
-        # Combine results
-        all_results = []
-        if not resource_types or 'note' in resource_types:
-            all_results.extend(list(notes))
-        if not resource_types or 'syllabus' in resource_types:
-            all_results.extend(list(syllabi))
-        if not resource_types or 'questionbank' in resource_types:
-            all_results.extend(list(questionbanks))
-        
-        # Apply TF-IDF ranking if query provided
-        if query and all_results:
-            results = calculate_tf_idf(query, all_results)
-        else:
-            results = all_results
-        
-        # Apply sorting
-        if sort_by == 'newest':
-            results.sort(key=lambda x: x.created_at, reverse=True)
-        elif sort_by == 'oldest':
-            results.sort(key=lambda x: x.created_at)
-        elif sort_by == 'downloads':
-            results.sort(key=lambda x: x.download_count, reverse=True)
-        elif sort_by == 'views':
-            results.sort(key=lambda x: x.view_count, reverse=True)
+        # Ranked (type, id) lists are cached per normalized query and filters
+        params = {
+            'q': normalize_query(query),
+            'faculty': faculty.id if faculty else None,
+            'subject': subject.id if subject else None,
+            'levels': sorted(levels),
+            'types': sorted(resource_types),
+            'sort': sort_by,
+        }
+        results = cached_search_results('advanced', params, lambda: _advanced_search_results(
+            normalize_query(query), faculty, subject, levels, resource_types, sort_by
+        ))
     
     # Pagination
     paginator = Paginator(results, 12)
@@ -625,7 +589,18 @@ def advanced_search(request):
         'page_obj': page_obj,
         'results_count': len(results),
     }
-    return render(request, 'advanced_search.html', context)
+    return render(request, 'general/advanced_search.html', context)
+
+# Search result kind -> template group in general/search.html
+SEARCH_RESULT_GROUPS = {
+    'subject': 'subjects',
+    'syllabus': 'syllabi',
+    'questionbank': 'question_banks',
+    'chapter': 'chapters',
+    'viva': 'vivas',
+    'textbook': 'textbooks',
+    'practical': 'practicals',
+}
 
 @login_required
 def search(request):
@@ -635,67 +610,16 @@ def search(request):
     resource_type = request.GET.get('type')
     level = request.GET.get('level')
     
-    subjects = Subject.objects.filter(is_active=True).select_related('faculty')
-    syllabi = Syllabus.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    questionbanks = QuestionBank.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    chapters = Chapter.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    vivas = Viva.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    textbooks = TextBook.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    practicals = Practical.objects.filter(status='approved').select_related('subject', 'subject__faculty')
-    
-    if query:
-        subjects = subjects.filter(Q(name__icontains=query) | Q(description__icontains=query))
-        syllabi = syllabi.filter(Q(title__icontains=query) | Q(content__icontains=query))
-        questionbanks = questionbanks.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        chapters = chapters.filter(Q(title__icontains=query) | Q(description__icontains=query))
-        vivas = vivas.filter(Q(title__icontains=query) | Q(description__icontains=query) | Q(question__icontains=query) | Q(answer__icontains=query))
-        textbooks = textbooks.filter(Q(title__icontains=query) | Q(description__icontains=query) | Q(author__icontains=query) | Q(publisher__icontains=query))
-        practicals = practicals.filter(Q(title__icontains=query) | Q(description__icontains=query) | Q(objective__icontains=query) | Q(procedure__icontains=query))
-    
-    if faculty_id:
-        subjects = subjects.filter(faculty_id=faculty_id)
-        syllabi = syllabi.filter(subject__faculty_id=faculty_id)
-        questionbanks = questionbanks.filter(subject__faculty_id=faculty_id)
-        chapters = chapters.filter(subject__faculty_id=faculty_id)
-        vivas = vivas.filter(subject__faculty_id=faculty_id)
-        textbooks = textbooks.filter(subject__faculty_id=faculty_id)
-        practicals = practicals.filter(subject__faculty_id=faculty_id)
-    
-    if subject_id:
-        subjects = subjects.filter(id=subject_id)
-        syllabi = syllabi.filter(subject_id=subject_id)
-        questionbanks = questionbanks.filter(subject_id=subject_id)
-        chapters = chapters.filter(subject_id=subject_id)
-        vivas = vivas.filter(subject_id=subject_id)
-        textbooks = textbooks.filter(subject_id=subject_id)
-        practicals = practicals.filter(subject_id=subject_id)
-    
-    if level:
-        subjects = subjects.filter(level=level)
-        syllabi = syllabi.filter(subject__level=level)
-        questionbanks = questionbanks.filter(subject__level=level)
-        chapters = chapters.filter(subject__level=level)
-        vivas = vivas.filter(subject__level=level)
-        textbooks = textbooks.filter(subject__level=level)
-        practicals = practicals.filter(subject__level=level)
-    
-    results = []
-    if not resource_type or resource_type == 'subject':
-        results += list(subjects)
-    if not resource_type or resource_type == 'syllabus':
-        results += list(syllabi)
-    if not resource_type or resource_type == 'questionbank':
-        results += list(questionbanks)
-    if not resource_type or resource_type == 'chapter':
-        results += list(chapters)
-    if not resource_type or resource_type == 'viva':
-        results += list(vivas)
-    if not resource_type or resource_type == 'textbook':
-        results += list(textbooks)
-    if not resource_type or resource_type == 'practical':
-        results += list(practicals)
-    
-    results = sorted(results, key=lambda x: getattr(x, 'name', getattr(x, 'title', '')).lower())
+    # Filtering, name ordering and pagination all run in the database and the
+    # ranked (type, id) list is cached; only the current page is loaded
+    search_text = normalize_query(query)
+    params = {
+        'q': search_text, 'faculty': faculty_id or '', 'subject': subject_id or '',
+        'level': level or '', 'type': resource_type or '',
+    }
+    results = cached_search_results('search', params, lambda: UnionSearchResults(
+        search_querysets(search_text, faculty_id, subject_id, level, resource_type)
+    ))
     paginator = Paginator(results, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -703,28 +627,19 @@ def search(request):
     faculties = Faculty.objects.filter(is_active=True)
     subjects = Subject.objects.filter(is_active=True)
     
-    # Group results by type for template
-    search_results = {
-        'subjects': [item for item in results if item.__class__.__name__ == 'Subject'],
-        'syllabi': [item for item in results if item.__class__.__name__ == 'Syllabus'],
-        'question_banks': [item for item in results if item.__class__.__name__ == 'QuestionBank'],
-        'chapters': [item for item in results if item.__class__.__name__ == 'Chapter'],
-        'vivas': [item for item in results if item.__class__.__name__ == 'Viva'],
-        'textbooks': [item for item in results if item.__class__.__name__ == 'TextBook'],
-        'practicals': [item for item in results if item.__class__.__name__ == 'Practical']
-    }
+    # Group the current page by type for template
+    search_results = {group: [] for group in SEARCH_RESULT_GROUPS.values()}
+    for item in page_obj.object_list:
+        search_results[SEARCH_RESULT_GROUPS[result_key(item)[0]]].append(item)
     
-    # Calculate search statistics
-    search_stats = {
-        'total_results': len(results),
-        'subjects_count': len(search_results['subjects']),
-        'syllabi_count': len(search_results['syllabi']),
-        'question_banks_count': len(search_results['question_banks']),
-        'chapters_count': len(search_results['chapters']),
-        'vivas_count': len(search_results['vivas']),
-        'textbooks_count': len(search_results['textbooks']),
-        'practicals_count': len(search_results['practicals'])
-    }
+    # Per-type, faculty and level counts from one grouped query (or the cache)
+    facets = results.facets()
+    search_stats = {'total_results': paginator.count}
+    for kind, group in SEARCH_RESULT_GROUPS.items():
+        search_stats[f'{group}_count'] = facets.types.get(kind, 0)
+    for faculty in faculties:
+        faculty.result_count = facets.faculties.get(faculty.id, 0)
+    level_options = [(str(i), facets.levels.get(i, 0)) for i in range(1, 9)]
     
     return render(request, 'general/search.html', {
         'page_obj': page_obj,
@@ -736,7 +651,8 @@ def search(request):
         'resource_type': resource_type,
         'level': level,
         'search_results': search_results,
-        'search_stats': search_stats
+        'search_stats': search_stats,
+        'level_options': level_options,
     })
 
 
@@ -760,14 +676,9 @@ def download_resource(request, content_type, content_id):
             return HttpResponse('Invalid content type', status=400)
         
         # Log download
-        DownloadLog.objects.create(
-            user=request.user,
-            content_type=content_type,
-            content_id=content_id,
-            ip_address=request.META.get('REMOTE_ADDR')
-        )
-        # Invalidate user recommendations cache to ensure dynamic updates
-        invalidate_user_recommendations_cache(request.user.id)
+        log_download(request.user, content_type, content_id, request.META.get('REMOTE_ADDR'))
+        # Count the activity; recommendations refresh after enough of it
+        record_user_activity(request.user.id)
         
         # Increment download count
         resource.increment_download()
@@ -1073,12 +984,7 @@ def question_bank_redirect(request):
 @login_required
 def get_trending_subjects(request):
     """Get trending subjects for AJAX requests"""
-    week_ago = timezone.now() - timedelta(days=7)
-    trending_subjects = Subject.objects.annotate(
-        recent_activity=Count('syllabi', filter=Q(syllabi__created_at__gte=week_ago)) +
-                        Count('notes', filter=Q(notes__created_at__gte=week_ago)) +
-                        Count('question_banks', filter=Q(question_banks__created_at__gte=week_ago))
-    ).filter(recent_activity__gt=0).order_by('-recent_activity')[:5]
+    trending_subjects = get_trending_subjects_ranking(limit=5)
     
     data = []
     for subject in trending_subjects:
@@ -1092,20 +998,22 @@ def get_trending_subjects(request):
     
     return JsonResponse({'subjects': data})
 
+@login_required
+def autocomplete(request):
+    """Subject and resource title suggestions for the search box"""
+    query = request.GET.get('q', '').strip()[:100]
+    suggestions = autocomplete_suggestions(query, limit=10) if query else []
+    return JsonResponse({'suggestions': [suggestion._asdict() for suggestion in suggestions]})
+
 def base_context(request):
     """Context processor for base template"""
     faculties = Faculty.objects.filter(is_active=True).order_by('name')
     dark_mode = request.session.get('dark_mode', True)  # Default to dark mode
     
-    # Get trending subjects for sidebar
-    week_ago = timezone.now() - timedelta(days=7)
+    # Get trending subjects for sidebar (precomputed by the trending pass)
     trending_subjects = cache.get('trending_subjects')
-    if not trending_subjects:
-        trending_subjects = Subject.objects.annotate(
-            recent_activity=Count('syllabi', filter=Q(syllabi__created_at__gte=week_ago)) +
-                            Count('notes', filter=Q(notes__created_at__gte=week_ago)) +
-                            Count('question_banks', filter=Q(question_banks__created_at__gte=week_ago))
-        ).filter(recent_activity__gt=0).order_by('-recent_activity')[:5]
+    if trending_subjects is None:
+        trending_subjects = get_trending_subjects_ranking(limit=5)
         cache.set('trending_subjects', trending_subjects, 300)  # Cache for 5 minutes
     
     return {
@@ -1259,14 +1167,9 @@ def syllabus_detail(request, subject_id, syllabus_id):
         return redirect('login')
     
     # Log view
-    ViewLog.objects.create(
-        user=request.user,
-        content_type='syllabus',
-        content_id=syllabus.id,
-        ip_address=request.META.get('REMOTE_ADDR')
-    )
-    # Invalidate user recommendations cache to ensure dynamic updates
-    invalidate_user_recommendations_cache(request.user.id)
+    log_view(request.user, 'syllabus', syllabus.id, request.META.get('REMOTE_ADDR'))
+    # Count the activity; recommendations refresh after enough of it
+    record_user_activity(request.user.id)
     
     # Get related syllabi
     related_syllabi = Syllabus.objects.filter(
@@ -1294,14 +1197,9 @@ def question_bank_detail(request, subject_id, question_bank_id):
         return redirect('login')
     
     # Log view
-    ViewLog.objects.create(
-        user=request.user,
-        content_type='questionbank',
-        content_id=question_bank.id,
-        ip_address=request.META.get('REMOTE_ADDR')
-    )
-    # Invalidate user recommendations cache to ensure dynamic updates
-    invalidate_user_recommendations_cache(request.user.id)
+    log_view(request.user, 'questionbank', question_bank.id, request.META.get('REMOTE_ADDR'))
+    # Count the activity; recommendations refresh after enough of it
+    record_user_activity(request.user.id)
     
     # Get related question banks
     related_question_banks = QuestionBank.objects.filter(
@@ -1329,14 +1227,9 @@ def question_bank_solution_detail(request, subject_id, solution_id):
         return redirect('login')
     
     # Log view
-    ViewLog.objects.create(
-        user=request.user,
-        content_type='questionbanksolution',
-        content_id=solution.id,
-        ip_address=request.META.get('REMOTE_ADDR')
-    )
-    # Invalidate user recommendations cache to ensure dynamic updates
-    invalidate_user_recommendations_cache(request.user.id)
+    log_view(request.user, 'questionbanksolution', solution.id, request.META.get('REMOTE_ADDR'))
+    # Count the activity; recommendations refresh after enough of it
+    record_user_activity(request.user.id)
     
     # Get related question bank solutions
     related_solutions = QuestionBankSolution.objects.filter(
@@ -1398,82 +1291,19 @@ def admin_dashboard(request):
     
     # Get comprehensive statistics
     total_users = User.objects.count()
-    total_subjects = Subject.objects.count()
-    total_faculties = Faculty.objects.filter(is_active=True).count()
+    stats = get_admin_statistics()
+    total_subjects = len(stats.subject_list())
+    total_faculties = len(stats.faculties)
     
     # Resource statistics
-    total_syllabi = Syllabus.objects.count()
-    total_notes = Note.objects.count()
-    total_question_banks = QuestionBank.objects.count()
-    total_chapters = Chapter.objects.count()
-    total_resources = total_syllabi + total_notes + total_question_banks + total_chapters
-    
-    # Approval statistics
-    pending_syllabi = Syllabus.objects.filter(status='pending').count()
-    pending_notes = Note.objects.filter(status='pending').count()
-    pending_question_banks = QuestionBank.objects.filter(status='pending').count()
-    pending_chapters = Chapter.objects.filter(status='pending').count()
-    total_pending = pending_syllabi + pending_notes + pending_question_banks + pending_chapters
-    
-    approved_syllabi = Syllabus.objects.filter(status='approved').count()
-    approved_notes = Note.objects.filter(status='approved').count()
-    approved_question_banks = QuestionBank.objects.filter(status='approved').count()
-    approved_chapters = Chapter.objects.filter(status='approved').count()
-    total_approved = approved_syllabi + approved_notes + approved_question_banks + approved_chapters
-    
-    # Get faculties for faculty management section
-    faculties = Faculty.objects.filter(is_active=True).annotate(
-        subject_count=Count('subjects', filter=Q(subjects__is_active=True)),
-        resource_count=Count('subjects__syllabi', filter=Q(subjects__syllabi__status='approved')) +
-                     Count('subjects__notes', filter=Q(subjects__notes__status='approved')) +
-                     Count('subjects__question_banks', filter=Q(subjects__question_banks__status='approved')) +
-                     Count('subjects__chapters', filter=Q(subjects__chapters__status='approved'))
-    ).order_by('name')
+    resource_breakdown = stats.resource_breakdown()
+    total_resources = sum(counts['total'] for counts in resource_breakdown.values())
+    total_pending = sum(counts['pending'] for counts in resource_breakdown.values())
+    total_approved = sum(counts['approved'] for counts in resource_breakdown.values())
     
-    # Faculty-wise statistics with level breakdown
-    faculty_stats = []
-    for faculty in Faculty.objects.filter(is_active=True):
-        faculty_subjects = Subject.objects.filter(faculty=faculty).count()
-        faculty_syllabi = Syllabus.objects.filter(subject__faculty=faculty).count()
-        faculty_notes = Note.objects.filter(subject__faculty=faculty).count()
-        faculty_questions = QuestionBank.objects.filter(subject__faculty=faculty).count()
-        faculty_chapters = Chapter.objects.filter(subject__faculty=faculty).count()
-        
-        # Get level-wise breakdown for this faculty
-        level_breakdown = []
-        for level in range(1, faculty.total_levels + 1):
-            level_subjects = Subject.objects.filter(faculty=faculty, level=level)
-            level_syllabi = Syllabus.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            level_questions = QuestionBank.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            level_chapters = Chapter.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            level_textbooks = TextBook.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            level_practicals = Practical.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            level_vivas = Viva.objects.filter(subject__faculty=faculty, subject__level=level).count()
-            
-            level_breakdown.append({
-                'level': level,
-                'level_name': faculty.get_level_display_name(level),
-                'subjects': level_subjects.count(),
-                'syllabi': level_syllabi,
-                'questions': level_questions,
-                'chapters': level_chapters,
-                'textbooks': level_textbooks,
-                'practicals': level_practicals,
-                'vivas': level_vivas,
-                'total_resources': level_syllabi + level_questions + level_chapters + level_textbooks + level_practicals + level_vivas,
-                'subject_list': list(level_subjects.values('id', 'name', 'level'))
-            })
-        
-        faculty_stats.append({
-            'faculty': faculty,
-            'subjects': faculty_subjects,
-            'syllabi': faculty_syllabi,
-            'notes': faculty_notes,
-            'questions': faculty_questions,
-            'chapters': faculty_chapters,
-            'total_resources': faculty_syllabi + faculty_notes + faculty_questions + faculty_chapters,
-            'level_breakdown': level_breakdown
-        })
+    # Faculties for faculty management section, and faculty-wise statistics with level breakdown
+    faculties = stats.faculty_summaries()
+    faculty_stats = stats.faculty_stats()
     
     # Recent activity
     recent_uploads = []
@@ -1531,12 +1361,7 @@ def admin_dashboard(request):
         'published_mcq_questions': published_mcq_questions,
         'total_mcq_quizzes': total_mcq_quizzes,
         'recent_mcq_questions': recent_mcq_questions,
-        'resource_breakdown': {
-            'syllabi': {'total': total_syllabi, 'pending': pending_syllabi, 'approved': approved_syllabi},
-            'notes': {'total': total_notes, 'pending': pending_notes, 'approved': approved_notes},
-            'question_banks': {'total': total_question_banks, 'pending': pending_question_banks, 'approved': approved_question_banks},
-            'chapters': {'total': total_chapters, 'pending': pending_chapters, 'approved': approved_chapters},
-        }
+        'resource_breakdown': resource_breakdown,
     }
     
     return render(request, 'admin/admin_dashboard.html', context)
@@ -2055,12 +1880,7 @@ def download_chapter(request, chapter_id):
     
     # Log download
     if request.user.is_authenticated:
-        DownloadLog.objects.create(
-            user=request.user,
-            content_type='chapter',
-            content_id=chapter.id,
-            ip_address=request.META.get('REMOTE_ADDR')
-        )
+        log_download(request.user, 'chapter', chapter.id, request.META.get('REMOTE_ADDR'))
     
     response = FileResponse(chapter.file, as_attachment=True, filename=f"{chapter.title}.pdf")
     return response
@@ -2598,29 +2418,7 @@ def admin_faculty_levels(request, faculty_slug):
         return redirect('admin_faculty_management')
     
     # Get level-wise statistics
-    levels_data = []
-    for level in range(1, faculty.total_levels + 1):
-        level_subjects = Subject.objects.filter(faculty=faculty, level=level, is_active=True)
-        level_syllabi = Syllabus.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_questions = QuestionBank.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_chapters = Chapter.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_textbooks = TextBook.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_practicals = Practical.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_vivas = Viva.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        
-        levels_data.append({
-            'level': level,
-            'level_name': faculty.get_level_display_name(level),
-            'subjects': level_subjects.count(),
-            'syllabi': level_syllabi,
-            'questions': level_questions,
-            'chapters': level_chapters,
-            'textbooks': level_textbooks,
-            'practicals': level_practicals,
-            'vivas': level_vivas,
-            'total_resources': level_syllabi + level_questions + level_chapters + level_textbooks + level_practicals + level_vivas,
-            'subject_list': list(level_subjects.values('id', 'name', 'level'))
-        })
+    levels_data = get_admin_statistics().level_breakdown(faculty, status='approved', active_only=True)
     
     context = {
         'faculty': faculty,
@@ -2912,29 +2710,7 @@ def admin_faculty_levels(request, faculty_slug):
         return redirect('admin_faculty_management')
     
     # Get level-wise statistics
-    levels_data = []
-    for level in range(1, faculty.total_levels + 1):
-        level_subjects = Subject.objects.filter(faculty=faculty, level=level, is_active=True)
-        level_syllabi = Syllabus.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_questions = QuestionBank.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_chapters = Chapter.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_textbooks = TextBook.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_practicals = Practical.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        level_vivas = Viva.objects.filter(subject__faculty=faculty, subject__level=level, status='approved').count()
-        
-        levels_data.append({
-            'level': level,
-            'level_name': faculty.get_level_display_name(level),
-            'subjects': level_subjects.count(),
-            'syllabi': level_syllabi,
-            'questions': level_questions,
-            'chapters': level_chapters,
-            'textbooks': level_textbooks,
-            'practicals': level_practicals,
-            'vivas': level_vivas,
-            'total_resources': level_syllabi + level_questions + level_chapters + level_textbooks + level_practicals + level_vivas,
-            'subject_list': list(level_subjects.values('id', 'name', 'level'))
-        })
+    levels_data = get_admin_statistics().level_breakdown(faculty, status='approved', active_only=True)
     
     context = {
         'faculty': faculty,
@@ -3196,12 +2972,12 @@ def recommendations_dashboard(request):
     user = request.user
     
     # Get user's faculty
-    from .recommend_utils import get_user_recommendations, get_user_faculty, get_global_trending_resources
+    from .recommend_utils import get_user_faculty
     
     user_faculty = get_user_faculty(user)
     
     # Get recommendations
-    recommendations = get_user_recommendations(user, limit=5)
+    recommendations = get_cached_recommendations(user, limit=5)
     
     # Debug information (can be removed in production)
     debug_info = {